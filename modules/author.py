@@ -1,59 +1,71 @@
 import pandas as pd
-import glob
-import ast  # For safely evaluating string representations of lists
+import numpy as np
+import argparse
+import storage
+import author_index
+import schema
+import instrument
 
-# Step 1: Read all CSV files
-csv_files = glob.glob("ludum_dare_games_*.csv")  # Select all CSV files in the directory
-df_list = [pd.read_csv(file) for file in csv_files]
+# Columns to keep
+columns_to_keep = schema.ENTRY_COLUMNS
 
-# Step 2: Flatten and count unique authors across files
-author_counts = {}  # Dictionary to store author ID occurrences
-author_data = {}  # Store last seen author-related data
+def flatten_authors(file):
+    """
+    Flatten one event file into one row per (author, game), parsing the
+    author lists in bulk and exploding them.
 
-# Columns to keep
-columns_to_keep = [
-    "game_position", "team_size", "ludum_dare_version","game_link", "id","cool", "feedback", "given", "grade", "grade-01-average", "grade-01-result",
-    "grade-02-average", "grade-02-result", "grade-03-average", "grade-03-result",
-    "grade-04-average", "grade-04-result", "grade-05-average", "grade-05-result",
-    "grade-06-average", "grade-06-result", "grade-07-average", "grade-07-result",
-    "grade-08-average", "grade-08-result", "smart"
-]
-
-# Step 3: Process each CSV file and add file name
-for file in csv_files:
-    df = pd.read_csv(file)
-    df = df.dropna(subset=["author"])  # Drop rows where "author" is empty
-    for _, row in df.iterrows():
-        # Safely convert the author string to a list if necessary
-        try:
-            # Convert author to a list if it is a string representation of a list (e.g., "[9110, 122697]")
-            authors = ast.literal_eval(row["author"]) if isinstance(row["author"], str) else [row["author"]]
-        except (ValueError, SyntaxError):
-            authors = []  # In case the author field is not formatted correctly
-        
-        # Handle case where `author` might be a single integer (not a list)
-        if isinstance(authors, int):
-            authors = [authors]  # Wrap it in a list
-
-        for author in authors:
-            if author:  # Ensure there's a valid author ID
-                # Increment the author count and store their data with file name
-                if author not in author_data:
-                    author_data[author] = []
-                author_data[author].append({"file_name": file, **row[columns_to_keep].to_dict()})
-                author_counts[author] = author_counts.get(author, 0) + 1
-
-# Step 4: Create final DataFrame
-result_data = []
-for author, data_list in author_data.items():
-    for data in data_list:
-        row_data = {"author": author, "count": author_counts[author], "file_name": data["file_name"]}
-        row_data.update({key: data[key] for key in columns_to_keep})
-        result_data.append(row_data)
-
-final_df = pd.DataFrame(result_data)
-
-# Step 5: Save to CSV
-final_df.to_csv("merged_authors_with_files.csv", index=False)
-
-print("Merged CSV created: merged_authors_with_files.csv")
+    Args:
+        file (str): Scraped event file (.csv, .parquet or .arrow)
+
+    Returns:
+        DataFrame: author, file_name, row (of the game in the file) and columns_to_keep
+    """
+    df = storage.read_exploded(file, columns=["author"] + columns_to_keep)
+    df = df.reindex(columns=["author"] + columns_to_keep)
+    df.insert(1, "file_name", file)
+    df.insert(2, "row", df.index)
+    return schema.apply(df.reset_index(drop=True))
+
+@instrument.timed("merge", rows=lambda merged, *args, **kwargs: len(merged))
+def merge_authors(files, workers=1):
+    """
+    Merge every event file into one row per (author, game). Files are
+    flattened in parallel worker processes (map) and combined here (reduce).
+
+    Args:
+        files (list): Scraped event files (.csv, .parquet or .arrow)
+        workers (int): Worker processes, None uses every core
+
+    Returns:
+        DataFrame: author, count, file_name, row and columns_to_keep, grouped
+        by author in order of first appearance
+    """
+    frames = storage.map_files(flatten_authors, list(files), workers)
+    if not frames:
+        return pd.DataFrame(columns=["author", "count", "file_name", "row"] + columns_to_keep)
+    merged = pd.concat(frames, ignore_index=True)
+
+    # Group rows by author, keeping first-seen author order and entry order
+    codes, _ = pd.factorize(merged["author"])
+    merged = merged.iloc[np.argsort(codes, kind="stable")].reset_index(drop=True)
+    merged.insert(1, "count", merged.groupby("author")["author"].transform("size"))
+    return schema.apply(merged)  # concat turns per-file categoricals back into strings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge scraped events into one row per author and game.")
+    parser.add_argument("--output_file", type=str, default="merged_authors_with_files.csv", help="Output file, .csv, .parquet or .arrow")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for parsing event files (default: every core)")
+    parser.add_argument("--index_file", type=str, default=author_index.INDEX_FILE, help="Author -> entries index, updated for changed event files")
+    args = parser.parse_args()
+
+    # Read every scraped event (Parquet/Arrow preferred over CSV) and save
+    files = storage.game_files()
+    final_df = merge_authors(files, args.workers)
+    storage.write_table(final_df, args.output_file)
+
+    print(f"Merged file created: {args.output_file}")
+
+    index = author_index.AuthorIndex(args.index_file)
+    updated = index.update(files, merged=final_df)
+    index.close()
+    print(f"Index updated: {args.index_file} ({len(updated)} changed event files)")
@@ -1,43 +1,79 @@
 import pandas as pd
-import glob
-from collections import defaultdict
+import argparse
+import numpy as np
+import storage
+import schema
+import instrument
 
-def find_duplicate_authors(csv_files):
+# Select and order the desired columns
+desired_columns = ["author", "ludum_dare_version"] + schema.SCORE_COLUMNS
+
+def load_event(file):
+    """Read one event file with one row per author ID of each team (runs in a worker process)."""
+    df = storage.read_exploded(file, columns=desired_columns)
+    df["file_name"] = file  # Add the file name as a new column
+    return schema.apply(df)
+
+@instrument.timed("dedup", rows=lambda result, *args, **kwargs: len(result[2]))
+def duplicate_author_rows(csv_files, workers=1, min_events=2):
     """
-    Find author IDs that appear in more than one CSV file.
+    Find author IDs that appear in `min_events` or more CSV files, with one
+    concat and a hash groupby instead of a scan per author.
     
     Args:
-        csv_files (list): List of CSV file paths to process
+        csv_files (list): List of event file paths to process (.csv, .parquet or .arrow)
+        workers (int): Worker processes used to parse the files, None uses every core
+        min_events (int): Minimum number of distinct files an author must appear in
         
     Returns:
-        dict: {author: list_of_dataframes} containing duplicates
+        dict: {author: row labels into the combined frame} for duplicates, in order of first appearance
         list: All unique duplicate author IDs
+        DataFrame: All files concatenated, one row per author of each team
     """
-    author_files = defaultdict(list)
+    df = schema.apply(pd.concat(storage.map_files(load_event, list(csv_files), workers), ignore_index=True))
     
-    for file in csv_files:
-        df = pd.read_csv(file)
-
-        df["file_name"] = file  # Add the file name as a new column
-        # Rename column if needed        
-        for author in df['author'].unique():
-            author_files[author].append(df[df['author'] == author])
+    # Filter only authors that appear in enough files
+    files_per_author = df.groupby("author", sort=False)["file_name"].nunique()
+    duplicate_rows = df[df["author"].isin(files_per_author.index[files_per_author >= min_events])]
     
-    # Filter only authors that appear in more than one file
-    duplicate_authors = {k: v for k, v in author_files.items() if len(v) > 1}
+    positions = duplicate_rows.groupby("author", sort=False).indices
+    authors = duplicate_rows["author"].unique().tolist()
+    duplicate_authors = {author: duplicate_rows.index[positions[author]] for author in authors}
+    
+    return duplicate_authors, authors, df
+
+def find_duplicate_authors(csv_files, workers=1, min_events=2):
+    """
+    Find author IDs that appear in more than one CSV file.
     
-    return duplicate_authors, list(duplicate_authors.keys())
+    Args:
+        csv_files (list): List of event file paths to process (.csv, .parquet or .arrow)
+        workers (int): Worker processes used to parse the files, None uses every core
+        min_events (int): Minimum number of distinct files an author must appear in
+        
+    Returns:
+        dict: {author: list_of_dataframes} containing duplicates, one frame per file
+        list: All unique duplicate author IDs
+    """
+    rows, authors, df = duplicate_author_rows(csv_files, workers, min_events)
+    duplicates = {
+        author: [group for _, group in df.loc[rows[author]].groupby("file_name", sort=False, observed=True)]
+        for author in authors
+    }
+    return duplicates, authors
 
-def extract_duplicates_to_csv(csv_files, output_file):
+def extract_duplicates_to_csv(csv_files, output_file, workers=1, min_events=2):
     """
     Process multiple CSVs and save duplicate authors to a new CSV.
     
     Args:
         csv_files (list): List of CSV file paths
         output_file (str): Path for output CSV
+        workers (int): Worker processes used to parse the files, None uses every core
+        min_events (int): Minimum number of distinct files an author must appear in
     """
     # Find duplicate authors
-    duplicates, authors = find_duplicate_authors(csv_files)
+    duplicates, authors, df = duplicate_author_rows(csv_files, workers, min_events)
     
     if not duplicates:
         print("No duplicate authors found across files.")
@@ -45,23 +81,8 @@ def extract_duplicates_to_csv(csv_files, output_file):
     
     print(f"Found {len(authors)} duplicate authors: {authors}")
     
-    # Combine all records for duplicate authors
-    dfs_to_combine = []
-    for author in authors:
-        for df in duplicates[author]:
-            dfs_to_combine.append(df)
-    
-    # Concatenate all records
-    combined_df = pd.concat(dfs_to_combine, ignore_index=True)
-    
-    # Select and order the desired columns
-    desired_columns = [
-        "author", "ludum_dare_version", "cool", "feedback", "given", "grade", 
-        "grade-01-average", "grade-01-result", "grade-02-average", "grade-02-result",
-        "grade-03-average", "grade-03-result", "grade-04-average", "grade-04-result",
-        "grade-05-average", "grade-05-result", "grade-06-average", "grade-06-result",
-        "grade-07-average", "grade-07-result", "grade-08-average", "grade-08-result", "smart"
-    ]
+    # Combine all records for duplicate authors, grouped by author; number formats follow all files
+    combined_df = storage.csv_frame(df).loc[np.concatenate(list(duplicates.values()))].reset_index(drop=True)
     
     # Filter only the columns that exist in the data
     available_columns = [col for col in desired_columns if col in combined_df.columns]
@@ -73,11 +94,16 @@ def extract_duplicates_to_csv(csv_files, output_file):
 
 # Example usage
 if __name__ == "__main__":
-    # Find all CSV files in the current directory
-    csv_files = glob.glob("ludum_dare_games_*.csv")
+    parser = argparse.ArgumentParser(description="Find authors that appear in more than one event.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for parsing event files (default: every core)")
+    parser.add_argument("--min_events", type=int, default=2, help="Report authors that appear in at least this many events")
+    args = parser.parse_args()
+
+    # Find all event files in the current directory (Parquet/Arrow preferred over CSV)
+    csv_files = storage.game_files()
     
     if not csv_files:
-        print("No CSV files found in current directory.")
+        print("No event files found in current directory.")
     else:
-        print(f"Processing {len(csv_files)} CSV files...")
-        extract_duplicates_to_csv(csv_files, "duplicate_authors_teams.csv")
\ No newline at end of file
+        print(f"Processing {len(csv_files)} event files...")
+        extract_duplicates_to_csv(csv_files, "duplicate_authors_teams.csv", args.workers, args.min_events)
\ No newline at end of file
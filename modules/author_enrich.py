@@ -0,0 +1,104 @@
+import asyncio
+import argparse
+import csv
+import os
+import pandas as pd
+import storage
+import instrument
+from ludum_dare3 import Fetcher, ResponseCache, get_nodes, API_BASE
+
+AUTHORS_FILE = "authors.csv"
+ITCH_AUTHORS_FILE = "itch_authors.csv"  # Same columns, written by itch_jam.py
+ITCH_AUTHOR_BASE = 2000000000  # itch.io users have no numeric id, itch_jam.py assigns them from here up
+AUTHOR_HEADERS = ["author", "name", "slug", "profile_link", "created", "avatar"]
+AUTHOR_CHUNK_SIZE = 100  # User ids per node2/get call
+
+def collect_author_ids(files):
+    """Unique ldjam.com author ids across every scraped event file (.csv, .parquet or .arrow), itch.io ids are left out."""
+    author_ids = set()
+    for file in files:
+        ids = storage.read_exploded(file, columns=["author"])["author"]
+        author_ids.update(ids[ids < ITCH_AUTHOR_BASE].tolist())
+    return author_ids
+
+def load_author_table(path=AUTHORS_FILE):
+    """Read the author table as {author_id: row}, empty if it does not exist yet."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline="", encoding="utf-8") as handle:
+        return {int(row["author"]): row for row in csv.DictReader(handle)}
+
+def process_author(node):
+    """Flatten one user node into an author table row."""
+    return {
+        "author": node.get("id", ""),
+        "name": node.get("name", ""),
+        "slug": node.get("slug", ""),
+        "profile_link": node.get("path", ""),
+        "created": node.get("created", ""),
+        "avatar": (node.get("meta") or {}).get("avatar", ""),
+    }
+
+async def fetch_authors(author_ids, rate=5, concurrency=8, base_url=API_BASE, cache=None):
+    """Fetch each author id once, in bulk node2/get batches."""
+    fetcher = Fetcher(rate=rate, concurrency=concurrency, base_url=base_url, cache=cache)
+    try:
+        nodes = await get_nodes(fetcher, sorted(author_ids), chunk_size=AUTHOR_CHUNK_SIZE)
+    finally:
+        fetcher.close()
+    return [process_author(node) for node in nodes]
+
+@instrument.timed("enrich", rows=lambda table, *args, **kwargs: len(table))
+def enrich_authors(files, output_file=AUTHORS_FILE, refresh=False, **fetch_options):
+    """
+    Build or extend the author table for every author in files.
+
+    Args:
+        files (list): Scraped event files (.csv, .parquet or .arrow)
+        output_file (str): Author table path, joined on `author` by later stages
+        refresh (bool): Re-fetch authors already in the table
+        fetch_options: Passed to fetch_authors (rate, concurrency, base_url, cache)
+    """
+    author_ids = collect_author_ids(files)
+    table = {} if refresh else load_author_table(output_file)
+    missing = author_ids - table.keys()
+    print(f"{len(author_ids)} unique authors, fetching {len(missing)} new profiles...")
+
+    for row in asyncio.run(fetch_authors(missing, **fetch_options)):
+        table[row["author"]] = row
+
+    with open(output_file, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=AUTHOR_HEADERS)
+        writer.writeheader()
+        for author in sorted(table):
+            writer.writerow(table[author])
+    print(f"Saved {len(table)} authors to {output_file}")
+    return table
+
+def join_author_profiles(df, paths=(AUTHORS_FILE, ITCH_AUTHORS_FILE)):
+    """Add author_name and profile_link next to the `author` column, from the author tables that exist."""
+    tables = [pd.read_csv(path, usecols=["author", "name", "profile_link"]) for path in paths if os.path.exists(path)]
+    if not tables:
+        return df
+    authors = pd.concat(tables, ignore_index=True).drop_duplicates("author").rename(columns={"name": "author_name"})
+    joined = df.merge(authors, on="author", how="left")
+    position = list(df.columns).index("author") + 1
+    columns = list(df.columns[:position]) + ["author_name", "profile_link"] + list(df.columns[position:])
+    return joined[columns]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch Ludum Dare author profiles for scraped games.")
+    parser.add_argument("--files", nargs="+", default=storage.game_files(), help="Scraped event files (.csv, .parquet or .arrow)")
+    parser.add_argument("--output_file", type=str, default=AUTHORS_FILE, help="Author table CSV")
+    parser.add_argument("--refresh", action="store_true", help="Re-fetch authors already in the table")
+    parser.add_argument("--rate", type=float, default=5, help="Global requests per second (0 disables the limit)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum requests in flight")
+    parser.add_argument("--base_url", type=str, default=API_BASE, help="API root, e.g. a local stub server")
+    parser.add_argument("--cache_dir", type=str, default=".http_cache", help="On-disk response cache directory")
+    parser.add_argument("--offline", action="store_true", help="Replay from the cache only, zero network calls")
+
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.cache_dir, offline=args.offline)
+    enrich_authors(args.files, args.output_file, args.refresh,
+                   rate=args.rate, concurrency=args.concurrency, base_url=args.base_url, cache=cache)
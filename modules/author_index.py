@@ -0,0 +1,193 @@
+import argparse
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+import author
+import schema
+import storage
+
+INDEX_FILE = "author_index.sqlite"
+SCHEMA_VERSION = 2  # Older index files are rebuilt from scratch
+
+# Entry columns kept in the index next to the (file, row) offset of the game
+entry_columns = ["author", "id", "file_name", "row", "game_position", "team_size", "ludum_dare_version", "game_link"] + schema.GRADE_COLUMNS
+
+# Category name -> grade column prefix, e.g. 'Fun' -> 'grade-02'
+category_columns = {category: prefix for prefix, category in schema.CATEGORY_MAPPING.items()}
+
+def _sql_type(col):
+    return "INTEGER" if schema.DTYPES[col].lower().startswith("int") else "REAL"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (file_name TEXT PRIMARY KEY, mtime REAL, size INTEGER);
+CREATE TABLE IF NOT EXISTS csv_offsets (file_name TEXT PRIMARY KEY, offsets BLOB);
+CREATE TABLE IF NOT EXISTS entries (
+    author INTEGER, id INTEGER, file_name TEXT, row INTEGER, game_position INTEGER, team_size INTEGER,
+    ludum_dare_version INTEGER, game_link TEXT,
+    {grades}
+);
+CREATE INDEX IF NOT EXISTS entries_author ON entries (author);
+CREATE INDEX IF NOT EXISTS entries_game ON entries (id);
+CREATE INDEX IF NOT EXISTS entries_file ON entries (file_name);
+""".format(grades=",\n    ".join(f'"{col}" {_sql_type(col)}' for col in entry_columns[8:]))
+
+def _quote(columns):
+    return ", ".join(f'"{col}"' for col in columns)
+
+class AuthorIndex:
+    """
+    SQLite index of every (author, game) entry: author id -> entries with
+    their (file, row) offset in the event data, and game id -> authors.
+
+    Files are re-indexed only when their size or modification time changed.
+    """
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.connection.executescript("DROP TABLE IF EXISTS entries; DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS csv_offsets;")
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def stale_files(self, files):
+        """Files that are new or changed since they were indexed."""
+        indexed = dict((name, (mtime, size)) for name, mtime, size in self.connection.execute("SELECT * FROM files"))
+        stale = []
+        for file in files:
+            stat = os.stat(file)
+            if indexed.get(file) != (stat.st_mtime, stat.st_size):
+                stale.append(file)
+        return stale
+
+    def update(self, files, merged=None):
+        """
+        Bring the index up to date with files, dropping files no longer listed.
+
+        Args:
+            files (list): Scraped event files (.csv, .parquet or .arrow)
+            merged (DataFrame): Output of author.merge_authors over files, its
+                rows and offsets are reused instead of re-reading the changed files
+
+        Returns:
+            list: Files that were (re-)indexed
+        """
+        files = list(files)
+        stale = self.stale_files(files)
+        by_file = dict(tuple(merged.groupby("file_name", sort=False))) if merged is not None and stale else {}
+
+        with self.connection:
+            removed = [(name,) for (name,) in self.connection.execute("SELECT file_name FROM files") if name not in files]
+            for params in removed + [(file,) for file in stale]:
+                for table in ("entries", "files", "csv_offsets"):
+                    self.connection.execute(f"DELETE FROM {table} WHERE file_name = ?", params)
+
+            for file in stale:
+                rows = by_file[file] if file in by_file else author.flatten_authors(file)
+                rows = rows.reindex(columns=entry_columns)
+                rows[schema.AVERAGE_COLUMNS] = schema.grade_matrix(rows, schema.AVERAGE_COLUMNS)
+                self.connection.executemany(
+                    f"INSERT INTO entries ({_quote(entry_columns)}) VALUES ({', '.join('?' * len(entry_columns))})",
+                    rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None),
+                )
+                stat = os.stat(file)
+                self.connection.execute("INSERT INTO files VALUES (?, ?, ?)", (file, stat.st_mtime, stat.st_size))
+        return stale
+
+    def _query(self, sql, params=()):
+        return schema.apply(pd.read_sql_query(sql, self.connection, params=params))
+
+    def games_by(self, author_id):
+        """Every entry of an author, newest event first."""
+        return self._query(
+            f"SELECT {_quote(entry_columns)} FROM entries WHERE author = ? ORDER BY ludum_dare_version DESC, id",
+            (author_id,),
+        )
+
+    def authors_of(self, game_id):
+        """Author ids of a game."""
+        return [row[0] for row in self.connection.execute("SELECT author FROM entries WHERE id = ? ORDER BY rowid", (game_id,))]
+
+    def teammates(self, author_id):
+        """Everyone who shared a game with an author, with the number of shared games."""
+        return self._query(
+            """
+            SELECT other.author AS author, COUNT(DISTINCT other.id) AS shared_games
+            FROM entries AS own JOIN entries AS other ON other.id = own.id
+            WHERE own.author = ? AND other.author != own.author
+            GROUP BY other.author ORDER BY shared_games DESC, other.author
+            """,
+            (author_id,),
+        )
+
+    def best_rank(self, author_id, category):
+        """
+        Best (lowest) result of an author in one category, e.g. 'Fun'.
+
+        Returns:
+            dict: result, average, id, ludum_dare_version and game_link of that entry, None if never ranked
+        """
+        prefix = category_columns[category]
+        row = self.connection.execute(
+            f'SELECT "{prefix}-result", "{prefix}-average", id, ludum_dare_version, game_link FROM entries '
+            f'WHERE author = ? AND "{prefix}-result" > 0 ORDER BY "{prefix}-result" LIMIT 1',
+            (author_id,),
+        ).fetchone()
+        return dict(zip(["result", "average", "id", "ludum_dare_version", "game_link"], row)) if row else None
+
+    def _csv_offsets(self, file):
+        """Record byte offsets of a CSV event file, found on its first lookup and kept in the index."""
+        row = self.connection.execute("SELECT offsets FROM csv_offsets WHERE file_name = ?", (file,)).fetchone()
+        if row:
+            return np.frombuffer(row[0], dtype=np.int64)
+        offsets = storage.csv_offsets(file)
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO csv_offsets VALUES (?, ?)", (file, offsets.tobytes()))
+        return offsets
+
+    def event_rows(self, author_id, columns=None):
+        """
+        Event file rows of an author's games, read at the indexed offsets only.
+
+        Args:
+            author_id (int): Author id
+            columns (list): Only load these columns, every column by default
+
+        Returns:
+            DataFrame: schema dtypes, games in file and row order
+        """
+        offsets = self.connection.execute("SELECT DISTINCT file_name, row FROM entries WHERE author = ? ORDER BY file_name, row", (author_id,)).fetchall()
+        if not offsets:
+            return pd.DataFrame()
+        selection = {}
+        for file, row in offsets:
+            selection.setdefault(file, []).append(row)
+        csv_offsets = {file: self._csv_offsets(file) for file in selection if file.endswith(".csv")}
+        return storage.read_rows(selection, columns, csv_offsets)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the author -> entries index.")
+    parser.add_argument("command", choices=["update", "games", "teammates", "best", "authors"], help="update the index, or query it")
+    parser.add_argument("key", type=int, nargs="?", help="Author id (games, teammates, best) or game id (authors)")
+    parser.add_argument("--category", type=str, default="Overall", choices=list(category_columns), help="Category for best")
+    parser.add_argument("--index_file", type=str, default=INDEX_FILE, help="SQLite index file")
+    args = parser.parse_args()
+
+    index = AuthorIndex(args.index_file)
+    if args.command == "update":
+        updated = index.update(storage.game_files())
+        print(f"Indexed {len(updated)} changed event files into {args.index_file}")
+    elif args.key is None:
+        parser.error(f"{args.command} needs an id")
+    elif args.command == "games":
+        print(index.games_by(args.key).to_string(index=False))
+    elif args.command == "teammates":
+        print(index.teammates(args.key).to_string(index=False))
+    elif args.command == "best":
+        print(index.best_rank(args.key, args.category))
+    else:
+        print(index.authors_of(args.key))
+    index.close()
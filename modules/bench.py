@@ -0,0 +1,173 @@
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+import numpy as np
+import author
+import author_dup
+import rank_author
+import rank_author1
+import storage
+import synth_events
+from pipeline import MODULE_DIR, project_modules
+
+BASELINE_FILE = "bench_baselines.json"
+DATA_DIR = "bench_data"
+
+# Total games per size; each size is EVENTS events of size / EVENTS games
+SIZES = {"1k": 1000, "10k": 10000, "100k": 100000, "1m": 1000000}
+EVENTS = 10
+SEED = 0
+
+STAGES = ["merge", "dedup", "rank", "rank1"]
+TOLERANCE = 0.25  # Allowed slowdown over the baseline before a stage counts as a regression
+# Absolute slack per stage on top: file reads and allocation swing sub-second
+# stages by ~0.1s between identical runs, and calibrate() only measures CPU
+MIN_SLACK_S = 0.15
+
+def calibrate(repeats=5):
+    """
+    Seconds a fixed NumPy + Python workload takes on this machine, best of repeats.
+    Baselines are scaled by the ratio to their own calibration, so they carry across machines.
+    """
+    values = np.random.default_rng(0).random(1000000)
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        np.sort(values)
+        sum(i * i for i in range(300000))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def generator_fingerprint(size):
+    """Hash of the generator settings of a size and of the code that writes the files (synth_events and what it imports)."""
+    sha = hashlib.sha256(json.dumps({"events": EVENTS, "games_per_event": SIZES[size] // EVENTS, "seed": SEED}).encode())
+    for module in project_modules("synth_events"):
+        with open(os.path.join(MODULE_DIR, f"{module}.py"), "rb") as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+def event_files(size, data_dir=DATA_DIR):
+    """Synthetic event files of a size, generated once and reused while the generator settings and code are unchanged."""
+    output_dir = os.path.join(data_dir, f"{size}-seed{SEED}")
+    params_file = os.path.join(output_dir, "generator.json")
+    fingerprint = generator_fingerprint(size)
+    files = storage.game_files(os.path.join(output_dir, "ludum_dare_games"))
+    stored = None
+    if os.path.exists(params_file):
+        with open(params_file, encoding="utf-8") as f:
+            stored = json.load(f).get("fingerprint")
+    if len(files) != EVENTS or stored != fingerprint:
+        print(f"Generating {SIZES[size]} games in {output_dir}")
+        for file in files:
+            os.remove(file)
+        files = synth_events.generate_events(output_dir, EVENTS, SIZES[size] // EVENTS, SEED)
+        with open(params_file, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint}, f)
+    return files
+
+def _median_time(func, repeats):
+    times, result = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+def run_size(size, repeats=3, workers=1, data_dir=DATA_DIR):
+    """
+    Time every stage on one size, median of repeats.
+
+    Returns:
+        dict: {'games', 'rows', stage: seconds}
+    """
+    files = event_files(size, data_dir)
+    timings = {"games": SIZES[size]}
+    timings["merge"], merged = _median_time(lambda: author.merge_authors(files, workers), repeats)
+    timings["dedup"], _ = _median_time(lambda: author_dup.duplicate_author_rows(files, workers), repeats)
+    timings["rank"], _ = _median_time(lambda: rank_author.calculate_author_rank(merged), repeats)
+    timings["rank1"], _ = _median_time(lambda: rank_author1.aggregate_author_rankings(merged), repeats)
+    timings["rows"] = len(merged)
+    return timings
+
+def find_regressions(results, calibration, baselines, tolerance=TOLERANCE):
+    """
+    Compare stage times with the stored baselines.
+
+    Returns:
+        list: (size, stage, seconds, allowed seconds) of every stage slower than allowed
+    """
+    scale = calibration / baselines["calibration_s"]
+    regressions = []
+    for size, timings in results.items():
+        baseline = baselines["sizes"].get(size)
+        if baseline is None:
+            print(f"{size}: no baseline, not checked")
+            continue
+        for stage in STAGES:
+            allowed = baseline[stage] * scale * (1 + tolerance) + MIN_SLACK_S
+            if timings[stage] > allowed:
+                regressions.append((size, stage, timings[stage], allowed))
+    return regressions
+
+def print_results(results, baselines=None, calibration=None):
+    scale = calibration / baselines["calibration_s"] if baselines else None
+    print(f"{'size':>6} {'stage':>6} {'seconds':>9} {'rows/s':>12} {'baseline':>9}")
+    for size, timings in results.items():
+        for stage in STAGES:
+            baseline = baselines["sizes"].get(size, {}).get(stage) if baselines else None
+            expected = f"{baseline * scale:9.3f}" if baseline is not None else f"{'-':>9}"
+            print(f"{size:>6} {stage:>6} {timings[stage]:9.3f} {timings['rows'] / timings[stage]:12.0f} {expected}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time merge, dedup and ranking on synthetic events and check them against stored baselines.")
+    parser.add_argument("sizes", nargs="*", default=["1k", "10k"], help=f"Sizes to run, from {list(SIZES)}")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per stage, the median counts")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for parsing event files")
+    parser.add_argument("--data_dir", type=str, default=DATA_DIR, help="Generated event files, kept between runs")
+    parser.add_argument("--baseline_file", type=str, default=BASELINE_FILE, help="Stored baseline timings")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--save_baseline", action="store_true", help="Store these timings as the new baselines instead of checking them")
+    args = parser.parse_args()
+
+    unknown = set(args.sizes) - set(SIZES)
+    if unknown:
+        parser.error(f"unknown sizes {sorted(unknown)}, choose from {list(SIZES)}")
+
+    results = {size: run_size(size, args.repeats, args.workers, args.data_dir) for size in args.sizes}
+    calibration = calibrate()
+
+    baselines = None
+    if os.path.exists(args.baseline_file):
+        with open(args.baseline_file, encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        stored = baselines if baselines and baselines["workers"] == args.workers else {"sizes": {}}
+        # Other sizes' baselines are rescaled to this machine's calibration
+        scale = calibration / stored["calibration_s"] if "calibration_s" in stored else 1.0
+        sizes = {size: {key: value * scale if key in STAGES else value for key, value in timings.items()} for size, timings in stored["sizes"].items()}
+        sizes.update({size: {key: round(value, 6) for key, value in timings.items()} for size, timings in results.items()})
+        with open(args.baseline_file, "w", encoding="utf-8") as f:
+            json.dump({"calibration_s": round(calibration, 6), "workers": args.workers, "events": EVENTS, "seed": SEED, "sizes": sizes}, f, indent=1)
+        print_results(results)
+        print(f"\nBaselines saved to {args.baseline_file}")
+        sys.exit(0)
+
+    print_results(results, baselines, calibration)
+    if baselines is None:
+        print(f"\nNo baselines in {args.baseline_file}, run with --save_baseline first")
+        sys.exit(0)
+    if baselines["workers"] != args.workers:
+        print(f"\nBaselines were taken with --workers {baselines['workers']}, not checked")
+        sys.exit(0)
+
+    regressions = find_regressions(results, calibration, baselines, args.tolerance)
+    for size, stage, seconds, allowed in regressions:
+        print(f"REGRESSION {size} {stage}: {seconds:.3f}s, allowed {allowed:.3f}s")
+    print(f"\n{len(regressions)} regressions")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,190 @@
+import argparse
+import numpy as np
+import pandas as pd
+import storage
+import instrument
+
+@instrument.timed("collab.load", rows=lambda pairs, *args, **kwargs: len(pairs[0]))
+def load_memberships(files, workers=1):
+    """
+    (author, game) pairs of every event file, from the scraped author lists.
+
+    Returns:
+        ndarray: author ids (int64)
+        ndarray: game ids (int64), same length
+    """
+    frames = storage.map_files(_event_memberships, list(files), workers)
+    if not frames:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    pairs = np.unique(np.concatenate(frames), axis=0)
+    return pairs[:, 0], pairs[:, 1]
+
+def _event_memberships(file):
+    df = storage.read_exploded(file, columns=["author", "id"])
+    return df[["author", "id"]].to_numpy(dtype=np.int64)
+
+def _group_starts(sorted_codes, n_groups):
+    """Start offset of every group in a sorted code array, plus the end."""
+    return np.searchsorted(sorted_codes, np.arange(n_groups + 1))
+
+class CollabGraph:
+    """
+    Undirected co-authorship graph in CSR form: the neighbours of node i are
+    indices[indptr[i]:indptr[i + 1]], weights count the games shared with each.
+
+    Nodes are author ids in ascending order (ids), so an id is found with one
+    searchsorted. Memberships are kept (sorted by game) for team queries.
+    """
+    @instrument.timed("collab.build", rows=lambda result, self, authors, games: len(authors))
+    def __init__(self, authors, games):
+        authors = np.asarray(authors, dtype=np.int64)
+        games = np.asarray(games, dtype=np.int64)
+        self.ids, author_codes = np.unique(authors, return_inverse=True)
+        self.game_ids, game_codes = np.unique(games, return_inverse=True)
+
+        # Members of each game are contiguous once sorted by game
+        order = np.lexsort((author_codes, game_codes))
+        self.member_nodes = author_codes[order]
+        self.member_games = game_codes[order]
+        self.game_starts = _group_starts(self.member_games, len(self.game_ids))
+        self.entries = np.bincount(author_codes, minlength=len(self.ids))
+
+        self.indptr, self.indices, self.weights = self._build_csr()
+
+    def _build_csr(self):
+        n = len(self.ids)
+        team_sizes = np.diff(self.game_starts)
+        row_sizes = team_sizes[self.member_games]  # Team size of each membership
+
+        # Every ordered pair of members of the same game, without Python loops
+        src = np.repeat(np.arange(len(self.member_nodes)), row_sizes)
+        row_offsets = np.repeat(np.cumsum(row_sizes) - row_sizes, row_sizes)
+        dst = np.repeat(self.game_starts[self.member_games], row_sizes) + (np.arange(len(src)) - row_offsets)
+        src, dst = self.member_nodes[src], self.member_nodes[dst]
+        keep = src != dst
+
+        # Duplicate pairs are the games shared by the same two authors
+        keys, weights = np.unique(src[keep] * n + dst[keep], return_counts=True)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // n, minlength=n), out=indptr[1:])
+        return indptr, (keys % n).astype(np.int32 if n < 2**31 else np.int64), weights.astype(np.int32)
+
+    def node(self, author_id):
+        """Node index of an author id, KeyError if the author is unknown."""
+        position = np.searchsorted(self.ids, author_id)
+        if position == len(self.ids) or self.ids[position] != author_id:
+            raise KeyError(author_id)
+        return int(position)
+
+    def degree(self):
+        """Number of distinct collaborators of every node."""
+        return np.diff(self.indptr)
+
+    def collaborators(self, author_id):
+        """Collaborators of an author with the number of shared games, most frequent first."""
+        i = self.node(author_id)
+        span = slice(self.indptr[i], self.indptr[i + 1])
+        result = pd.DataFrame({'author': self.ids[self.indices[span]], 'shared_games': self.weights[span]})
+        return result.sort_values(['shared_games', 'author'], ascending=[False, True], kind='stable', ignore_index=True)
+
+    def connected_components(self):
+        """
+        Component label of every node (the smallest node index in it), by
+        min-label propagation over the CSR rows with pointer jumping.
+        """
+        n = len(self.ids)
+        labels = np.arange(n)
+        has_edges = self.degree() > 0
+        starts = self.indptr[:-1][has_edges]
+        while True:
+            neighbour_min = labels.copy()
+            if len(self.indices):
+                neighbour_min[has_edges] = np.minimum.reduceat(labels[self.indices], starts)
+            updated = np.minimum(labels, neighbour_min)
+            # Hook each label onto its own root, then jump pointers to the roots
+            np.minimum.at(updated, labels, updated)
+            while True:
+                jumped = updated[updated]
+                if np.array_equal(jumped, updated):
+                    break
+                updated = jumped
+            if np.array_equal(updated, labels):
+                return labels
+            labels = updated
+
+    @instrument.timed("collab.components")
+    def components(self):
+        """One row per author: author, component label and component size."""
+        labels = self.connected_components()
+        sizes = np.bincount(labels, minlength=len(labels))
+        return pd.DataFrame({'author': self.ids, 'component': labels, 'component_size': sizes[labels]})
+
+    def collaboration_counts(self):
+        """Every collaborating pair once (author_a < author_b) with its shared game count, most frequent first."""
+        src = np.repeat(np.arange(len(self.ids)), self.degree())
+        upper = src < self.indices
+        pairs = pd.DataFrame({
+            'author_a': self.ids[src[upper]],
+            'author_b': self.ids[self.indices[upper]],
+            'shared_games': self.weights[upper],
+        })
+        return pairs.sort_values('shared_games', ascending=False, kind='stable', ignore_index=True)
+
+    @instrument.timed("collab.teams", rows=lambda teams, *args, **kwargs: len(teams))
+    def top_ranked_teams(self, rankings, top=100, min_top_members=2):
+        """
+        Games whose team holds several of the top-ranked authors.
+
+        Args:
+            rankings (DataFrame): Ranking output with author and rank columns
+                (one or more rows per author, the best rank is used)
+            top (int): Authors with rank <= top count as top-ranked
+            min_top_members (int): Keep teams with at least this many top-ranked members
+
+        Returns:
+            DataFrame: id, team (author ids), team_size, top_members, best_rank,
+            mean_rank (over ranked members), most top-ranked members first
+        """
+        best = rankings.groupby('author')['rank'].min()
+        node_ranks = best.reindex(self.ids).to_numpy(dtype=np.float64)
+        member_ranks = node_ranks[self.member_nodes]
+        is_top = member_ranks <= top
+
+        starts = self.game_starts[:-1]
+        nonempty = np.diff(self.game_starts) > 0
+        top_members = np.add.reduceat(is_top.astype(np.int64), starts[nonempty]) if len(is_top) else np.empty(0, dtype=np.int64)
+        selected = np.flatnonzero(nonempty)[top_members >= min_top_members]
+
+        rows = []
+        for g in selected:
+            span = slice(self.game_starts[g], self.game_starts[g + 1])
+            ranks = member_ranks[span]
+            rows.append({
+                'id': self.game_ids[g],
+                'team': self.ids[self.member_nodes[span]].tolist(),
+                'team_size': span.stop - span.start,
+                'top_members': int(is_top[span].sum()),
+                'best_rank': np.nanmin(ranks),
+                'mean_rank': np.nanmean(ranks),
+            })
+        teams = pd.DataFrame(rows, columns=['id', 'team', 'team_size', 'top_members', 'best_rank', 'mean_rank'])
+        return teams.sort_values(['top_members', 'mean_rank'], ascending=[False, True], kind='stable', ignore_index=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Co-authorship graph of every scraped event.")
+    parser.add_argument("--rankings_file", type=str, default="author_rankings1.csv", help="Ranking output with author and rank columns")
+    parser.add_argument("--top", type=int, default=100, help="Rank cut-off for top-ranked authors")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for reading event files (default: every core)")
+    args = parser.parse_args()
+
+    graph = CollabGraph(*load_memberships(storage.game_files(), args.workers))
+    components = graph.components()
+    print(f"{len(graph.ids)} authors, {len(graph.indices) // 2} collaborating pairs, "
+          f"{components['component'].nunique()} components (largest: {components['component_size'].max()} authors)")
+
+    graph.collaboration_counts().to_csv('collaborations.csv', index=False)
+    components.to_csv('collab_components.csv', index=False)
+    teams = graph.top_ranked_teams(storage.read_table(args.rankings_file, columns=['author', 'rank']), top=args.top)
+    teams.to_csv('top_ranked_teams.csv', index=False)
+
+    print(teams.head(10))
@@ -0,0 +1,62 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+FOREVER = float("inf")  # TTL for responses that never change
+
+class CacheMiss(LookupError):
+    """Raised in offline mode when a URL has no cached response."""
+
+class ResponseCache:
+    """
+    Content-keyed on-disk cache of JSON responses, stored gzip-compressed.
+
+    Args:
+        directory (str): Cache root, entries are sharded by the first two hex digits of the key
+        default_ttl (float): Seconds an entry stays fresh when no TTL is given on put
+        offline (bool): Serve only from the cache, never touch the network
+    """
+    def __init__(self, directory=".http_cache", default_ttl=3600, offline=False):
+        self.directory = directory
+        self.default_ttl = default_ttl
+        self.offline = offline
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def path(self, url):
+        key = self.key(url)
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def get(self, url):
+        """Return the cached payload for url, or None if missing or expired (expiry is ignored offline)."""
+        try:
+            with gzip.open(self.path(url), "rt", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (FileNotFoundError, EOFError, OSError, ValueError):
+            return None
+
+        if not self.offline and entry["expires"] is not None and entry["expires"] < time.time():
+            return None
+        return entry["data"]
+
+    def put(self, url, data, ttl=None):
+        """Store data for url, ttl=FOREVER marks it as never expiring."""
+        ttl = self.default_ttl if ttl is None else ttl
+        entry = {
+            "url": url,
+            "fetched": time.time(),
+            "expires": None if ttl == FOREVER else time.time() + ttl,
+            "data": data,
+        }
+
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, path)  # Atomic, concurrent writers never leave a torn entry
@@ -0,0 +1,295 @@
+import bisect
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Upper bounds (ms) of the HTTP latency histogram buckets, the last bucket is open
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+_lock = threading.Lock()
+_current = contextvars.ContextVar("instrument_stage", default=None)
+_profiling = threading.Lock()  # cProfile/tracemalloc only follow the outermost stage
+_open_stages = set()  # StageMetrics of every running stage, in any thread
+
+config = {"output": None, "profile": False, "trace_memory": False, "profile_dir": "profiles"}
+
+def configure(output=None, profile=False, trace_memory=False, profile_dir="profiles"):
+    """
+    Turn instrumentation output on.
+
+    Args:
+        output (str): JSON lines file to append records to, "-" for stderr, None disables output
+        profile (bool): cProfile the outermost stage, dump .prof files and top functions
+        trace_memory (bool): tracemalloc peak and top allocation sites per outermost stage
+        profile_dir (str): Directory for .prof files
+    """
+    config.update(output=output, profile=profile, trace_memory=trace_memory, profile_dir=profile_dir)
+
+def configure_from_env():
+    """INSTRUMENT_FILE, INSTRUMENT_PROFILE=1 and INSTRUMENT_TRACEMALLOC=1 enable the same options for any script."""
+    configure(
+        output=os.environ.get("INSTRUMENT_FILE") or None,
+        profile=os.environ.get("INSTRUMENT_PROFILE") == "1",
+        trace_memory=os.environ.get("INSTRUMENT_TRACEMALLOC") == "1",
+        profile_dir=os.environ.get("INSTRUMENT_PROFILE_DIR", "profiles"),
+    )
+
+def emit(record):
+    """Write one JSON line record, if output is configured."""
+    output = config["output"]
+    if not output:
+        return
+    line = json.dumps({"time": time.time(), **record}, default=str) + "\n"
+    with _lock:
+        if output == "-":
+            sys.stderr.write(line)
+        else:
+            with open(output, "a", encoding="utf-8") as f:
+                f.write(line)
+
+class HttpStats:
+    """Request counts, latency histogram, retries and bytes of the fetches made during a stage."""
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes = 0
+        self.cache_hits = 0
+        self.seconds = 0.0
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.statuses = {}
+
+    def add(self, seconds, nbytes=0, status=None, retries=0, error=False):
+        with _lock:
+            self.requests += 1
+            self.errors += bool(error)
+            self.retries += retries
+            self.bytes += nbytes
+            self.seconds += seconds
+            self.latency_counts[bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+            if status is not None:
+                self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+
+    def as_dict(self):
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes": self.bytes,
+            "mean_latency_ms": round(self.seconds / self.requests * 1000, 3) if self.requests else None,
+            "latency_histogram": {label: count for label, count in zip(labels, self.latency_counts) if count},
+            "statuses": self.statuses,
+        }
+
+class StageMetrics:
+    def __init__(self, name, parent):
+        self.name = name
+        self.parent = parent
+        self.rows = None
+        self.http = HttpStats()
+        self.child_peak_rss = 0
+        self.shared = False  # Ran alongside a stage that is neither its ancestor nor its descendant
+
+    def ancestors(self):
+        ancestors = set()
+        parent = self.parent
+        while parent is not None:
+            ancestors.add(parent)
+            parent = parent.parent
+        return ancestors
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS (VmHWM) of this process where Linux allows it; every thread shares it."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # Lifetime peak, KiB on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _top_functions(profiler, limit=15):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]  # By cumulative time
+    return [
+        {"function": f"{os.path.basename(file)}:{line}({func})", "calls": calls, "tottime": round(tottime, 6), "cumtime": round(cumtime, 6)}
+        for (file, line, func), (_, calls, tottime, cumtime, _) in rows
+    ]
+
+@contextmanager
+def stage(name, rows=None, **fields):
+    """
+    Measure a block as a named stage and emit one record when it ends:
+    wall and CPU time (own and of finished child processes), rows and
+    rows/s, peak RSS, the HTTP traffic made inside it, and optionally a
+    cProfile top list and tracemalloc peak. Stages nest.
+
+    The kernel keeps one peak RSS per process, so it is only reset for a
+    stage when no other stage runs beside it (nested ones aside); a stage
+    that overlaps another one, e.g. parallel pipeline stages, reports the
+    process peak with "peak_rss_scope": "process".
+
+    Yields:
+        StageMetrics: set .rows (or call add_rows) when the count is known late
+    """
+    metrics = StageMetrics(name, _current.get())
+    metrics.rows = rows
+    token = _current.set(metrics)
+    enabled = bool(config["output"])
+    measure_peak = False
+    with _lock:
+        for other in _open_stages - metrics.ancestors():
+            other.shared = metrics.shared = True
+        _open_stages.add(metrics)
+        if enabled and not metrics.shared:
+            peak_so_far = _peak_rss_bytes()
+            measure_peak = _reset_peak_rss()
+            if measure_peak and metrics.parent is not None:  # The reset drops the parent's peak up to here
+                metrics.parent.child_peak_rss = max(metrics.parent.child_peak_rss, peak_so_far)
+
+    profiler = None
+    tracing = False
+    owns_profiling = enabled and (config["profile"] or config["trace_memory"]) and _profiling.acquire(blocking=False)
+    if owns_profiling:
+        if config["profile"]:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        if config["trace_memory"]:
+            tracing = not tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    start_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    ok = False
+    try:
+        yield metrics
+        ok = True
+    finally:
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        _current.reset(token)
+        with _lock:
+            _open_stages.discard(metrics)
+
+        peak_rss = max(_peak_rss_bytes(), metrics.child_peak_rss)
+        if metrics.parent is not None:
+            metrics.parent.child_peak_rss = max(metrics.parent.child_peak_rss, peak_rss)
+
+        record = {
+            "type": "stage",
+            "stage": name,
+            "parent": metrics.parent.name if metrics.parent else None,
+            "ok": ok,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "child_cpu_s": round((children.ru_utime + children.ru_stime) - (start_children.ru_utime + start_children.ru_stime), 6),
+            "rows": metrics.rows,
+            "rows_per_s": round(metrics.rows / wall, 1) if metrics.rows and wall > 0 else None,
+            "peak_rss_mb": round(peak_rss / 2**20, 1),
+            "peak_rss_scope": "stage" if measure_peak and not metrics.shared else "process",
+            **fields,
+        }
+        if metrics.http.requests or metrics.http.cache_hits:
+            record["http"] = metrics.http.as_dict()
+
+        if owns_profiling:
+            if profiler:
+                profiler.disable()
+                os.makedirs(config["profile_dir"], exist_ok=True)
+                path = os.path.join(config["profile_dir"], f"{name}-{os.getpid()}-{int(time.time())}.prof")
+                profiler.dump_stats(path)
+                record["profile"] = {"file": path, "top": _top_functions(profiler)}
+            if config["trace_memory"]:
+                current, peak = tracemalloc.get_traced_memory()
+                top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+                record["tracemalloc"] = {
+                    "peak_mb": round(peak / 2**20, 2),
+                    "current_mb": round(current / 2**20, 2),
+                    "top": [{"line": str(stat.traceback[0]), "size_kb": round(stat.size / 1024, 1), "count": stat.count} for stat in top],
+                }
+                if tracing:
+                    tracemalloc.stop()
+            _profiling.release()
+
+        emit(record)
+
+def timed(name, rows=None):
+    """
+    Decorator running a function (sync or async) as a stage.
+
+    Args:
+        rows (callable): rows(result, *args, **kwargs) -> rows processed, unless the body set them
+    """
+    def decorate(func):
+        def count(metrics, result, args, kwargs):
+            if rows is not None and metrics.rows is None:
+                metrics.rows = rows(result, *args, **kwargs)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name) as metrics:
+                    result = await func(*args, **kwargs)
+                    count(metrics, result, args, kwargs)
+                    return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name) as metrics:
+                result = func(*args, **kwargs)
+                count(metrics, result, args, kwargs)
+                return result
+        return wrapper
+    return decorate
+
+def add_rows(n):
+    """Add to the row count of the current stage, if any."""
+    metrics = _current.get()
+    if metrics is not None:
+        with _lock:
+            metrics.rows = (metrics.rows or 0) + n
+
+def record_http(seconds, nbytes=0, status=None, retries=0, error=False):
+    """Record one HTTP request against the current stage and the stages enclosing it."""
+    metrics = _current.get()
+    while metrics is not None:
+        metrics.http.add(seconds, nbytes, status, retries, error)
+        metrics = metrics.parent
+
+def record_cache_hit():
+    """Record a response served from the on-disk cache against the current stage and the stages enclosing it."""
+    metrics = _current.get()
+    while metrics is not None:
+        with _lock:
+            metrics.http.cache_hits += 1
+        metrics = metrics.parent
+
+configure_from_env()
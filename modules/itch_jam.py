@@ -0,0 +1,334 @@
+import argparse
+import asyncio
+import csv
+import os
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+import instrument
+import schema
+import storage
+from author_enrich import AUTHOR_HEADERS, ITCH_AUTHOR_BASE, ITCH_AUTHORS_FILE
+from http_cache import ResponseCache
+from ludum_dare3 import Fetcher, save_to_csv
+
+ITCH_BASE = "https://itch.io"
+AUTHOR_IDS_FILE = ITCH_AUTHORS_FILE  # Also the itch.io profile table joined into the rankings
+ITCH_GAME_BASE = 1000000000  # Rate ids are written to `id` from here up, clear of ldjam.com game ids
+ITCH_EVENT_BASE = 1000000  # Default event ids of jams, clear of Ludum Dare event numbers
+
+# Jam criteria -> Ludum Dare category of the grade columns, criteria not listed are dropped
+CRITERIA_CATEGORIES = {
+    'overall': 'Overall',
+    'fun': 'Fun',
+    'enjoyment': 'Fun',
+    'gameplay': 'Fun',
+    'innovation': 'Innovation',
+    'creativity': 'Innovation',
+    'originality': 'Innovation',
+    'theme': 'Theme',
+    'use of the theme': 'Theme',
+    'theme interpretation': 'Theme',
+    'graphics': 'Graphics',
+    'visuals': 'Graphics',
+    'presentation': 'Graphics',
+    'art': 'Graphics',
+    'audio': 'Audio',
+    'sound': 'Audio',
+    'music': 'Audio',
+    'humor': 'Humor',
+    'mood': 'Mood',
+    'atmosphere': 'Mood',
+}
+CATEGORY_PREFIXES = {category: prefix for prefix, category in schema.CATEGORY_MAPPING.items()}
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+class _Node:
+    def __init__(self, tag, attrs, parent=None):
+        self.tag = tag
+        self.attrs = dict(attrs)
+        self.parent = parent
+        self.children = []  # _Node or str
+
+    def classes(self):
+        return (self.attrs.get("class") or "").split()
+
+    def iter(self):
+        for child in self.children:
+            if isinstance(child, _Node):
+                yield child
+                yield from child.iter()
+
+    def find_all(self, tag=None, cls=None):
+        return [node for node in self.iter() if (tag is None or node.tag == tag) and (cls is None or cls in node.classes())]
+
+    def find(self, tag=None, cls=None):
+        return next((node for node in self.iter() if (tag is None or node.tag == tag) and (cls is None or cls in node.classes())), None)
+
+    def text(self):
+        return " ".join(" ".join(child.text() if isinstance(child, _Node) else child for child in self.children).split())
+
+class _TreeBuilder(HTMLParser):
+    """Minimal DOM from html.parser, forgiving about unclosed tags."""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Node("document", [])
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        node = _Node(tag, attrs, self.stack[-1])
+        self.stack[-1].children.append(node)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_endtag(self, tag):
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth].tag == tag:
+                del self.stack[depth:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+def parse_html(html):
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+def _number(text, cast=float):
+    match = re.search(r"-?\d+(?:\.\d+)?", (text or "").replace(",", ""))
+    return cast(float(match.group())) if match else None
+
+def _author_links(node):
+    """(slug, name, profile url) of every itch.io user profile linked under node."""
+    authors = []
+    for link in node.find_all("a"):
+        url = link.attrs.get("href") or ""
+        host = urlsplit(url).hostname or ""
+        if host.endswith(".itch.io") and urlsplit(url).path.strip("/") == "":
+            slug = host[:-len(".itch.io")]
+            if slug not in (author[0] for author in authors):
+                authors.append((slug, link.text(), f"https://{host}"))
+    return authors
+
+def _criteria(node):
+    """{criteria: (rank, score)} from the ranking_results_table under node; score is the adjusted one ranks are based on."""
+    results = {}
+    table = node.find("table", "ranking_results_table")
+    if table is None:
+        return results
+    for row in table.find_all("tr"):
+        cells = [cell.text() for cell in row.find_all("td")]
+        if len(cells) >= 3:
+            results[cells[0].lower()] = (_number(cells[1], int), _number(cells[2]))
+    return results
+
+def _ratings(node):
+    match = re.search(r"Ranked from ([\d,]+) ratings?", node.text())
+    return int(match.group(1).replace(",", "")) if match else None
+
+def parse_results_page(html):
+    """
+    Entries of one /jam/<jam>/results page (runs in a worker process).
+
+    Returns:
+        dict: 'entries' (path, entry_id, name, authors, criteria, ratings) in
+        page order, and 'pages', the highest results page linked
+    """
+    root = parse_html(html)
+    entries = []
+    for block in root.find_all(cls="game_rank"):
+        link = next((a for a in block.find_all("a") if re.search(r"/rate/\d+", a.attrs.get("href") or "")), None)
+        if link is None:
+            continue
+        path = urlsplit(link.attrs["href"]).path
+        entries.append({
+            "path": path,
+            "entry_id": int(re.search(r"/rate/(\d+)", path).group(1)),
+            "name": link.text(),
+            "authors": _author_links(block),
+            "criteria": _criteria(block),
+            "ratings": _ratings(block),
+        })
+    pages = [int(page) for page in re.findall(r"[?&]page=(\d+)", html)]
+    return {"entries": entries, "pages": max(pages, default=1)}
+
+def parse_entry_page(html):
+    """
+    Details of one /jam/<jam>/rate/<id> entry page (runs in a worker process).
+
+    Returns:
+        dict: authors (empty without a submitted_by block), game_url, links,
+        comments, criteria and ratings
+    """
+    root = parse_html(html)
+    submitted = root.find(cls="submitted_by")  # Elsewhere the page links the jam host and commenters
+    game_link = root.find("a", "forward_link")
+    description = root.find(cls="formatted_description")
+    links = [a.attrs["href"] for a in description.find_all("a") if (a.attrs.get("href") or "").startswith("http")] if description else []
+    return {
+        "authors": _author_links(submitted) if submitted is not None else [],
+        "game_url": game_link.attrs.get("href") if game_link is not None else None,
+        "links": links,
+        "comments": len(root.find_all(cls="community_post")),
+        "criteria": _criteria(root),
+        "ratings": _ratings(root),
+    }
+
+def default_event_id(jam):
+    """Stable numeric event id of a jam slug, written to ludum_dare_version."""
+    return ITCH_EVENT_BASE + zlib.crc32(jam.encode("utf-8")) % ITCH_EVENT_BASE
+
+def load_author_ids(path=AUTHOR_IDS_FILE):
+    """{itch.io user slug: author row}, as assigned by earlier runs."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline="", encoding="utf-8") as handle:
+        return {row["slug"]: row for row in csv.DictReader(handle)}
+
+def save_author_ids(authors, path=AUTHOR_IDS_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=AUTHOR_HEADERS)
+        writer.writeheader()
+        writer.writerows(sorted(authors.values(), key=lambda row: int(row["author"])))
+    os.replace(tmp_path, path)
+
+def author_id(authors, slug, name, profile_link):
+    """Integer id of an itch.io user, assigned once and kept in the author table so it is stable across jams."""
+    if slug not in authors:
+        authors[slug] = {"author": ITCH_AUTHOR_BASE + len(authors), "name": name, "slug": slug, "profile_link": profile_link, "created": "", "avatar": ""}
+    return int(authors[slug]["author"])
+
+def entry_row(entry, details, event_id, position, authors):
+    """
+    One entry as a row in the save_to_csv layout of ludum_dare3.py, `id` is
+    the rate id offset by ITCH_GAME_BASE.
+
+    Criteria map onto the grade-NN-average/result columns by name
+    (CRITERIA_CATEGORIES); the number of ratings goes to `grade`, as on ldjam.com.
+    """
+    team = details["authors"] or entry["authors"]
+    ids = [author_id(authors, slug, name, link) for slug, name, link in team]
+    game_url = details["game_url"] or ""
+    row = {
+        "id": ITCH_GAME_BASE + entry["entry_id"],
+        "name": entry["name"],
+        "author": ids,
+        "team_size": len(ids),
+        "slug": urlsplit(game_url).path.strip("/") or str(entry["entry_id"]),
+        "published": "",
+        "created": "",
+        "modified": "",
+        "comments": details["comments"],
+        "game_position": position,
+        "ludum_dare_version": event_id,
+        "data_authors": " ".join(link for _, _, link in team),
+        "game_link": entry["path"],
+        "links_body": list(dict.fromkeys(([game_url] if game_url else []) + details["links"])),
+        "grade": details["ratings"] or entry["ratings"] or "",
+    }
+    for criteria, (rank, score) in {**entry["criteria"], **details["criteria"]}.items():
+        category = CRITERIA_CATEGORIES.get(criteria)
+        if category is None or f"{CATEGORY_PREFIXES[category]}-average" in row:
+            continue  # Unknown criteria, or a second criteria for the same category
+        row[f"{CATEGORY_PREFIXES[category]}-average"] = round(score, schema.AVERAGE_DECIMALS) if score is not None else ""
+        row[f"{CATEGORY_PREFIXES[category]}-result"] = rank if rank is not None else ""
+    return row
+
+@instrument.timed("itch")
+async def ingest_jam(jam, event_id=None, limit=None, output_file="ludum_dare_games", rate=5, concurrency=8, base_url=ITCH_BASE,
+                     cache=None, workers=None, fmt="csv", author_file=AUTHOR_IDS_FILE):
+    """
+    Fetch an itch.io jam's results and entry pages and save them as an event file.
+
+    Pages are fetched concurrently through one Fetcher (bounded concurrency,
+    rate limit, cache) and each is parsed in a process pool as soon as it
+    arrives, so parsing overlaps the remaining downloads.
+
+    Args:
+        jam (str): Jam slug, as in https://itch.io/jam/<jam>/results
+        event_id (int): ludum_dare_version written for the jam (default: derived from the slug)
+        limit (int): Only the top limit entries, None or <= 0 ingests every ranked entry
+        workers (int): Parser processes, None uses every core
+
+    Returns:
+        str: The written event file
+    """
+    event_id = event_id or default_event_id(jam)
+    fetcher = Fetcher(rate=rate, concurrency=concurrency, base_url=base_url, cache=cache)
+    loop = asyncio.get_running_loop()
+    workers = workers or os.cpu_count()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    async def fetch_parsed(path, parse):
+        html = await fetcher.fetch_text(path)
+        return await loop.run_in_executor(pool, parse, html) if pool else parse(html)
+
+    try:
+        print(f"Fetching results for itch.io jam {jam}...")
+        first = await fetch_parsed(f"/jam/{jam}/results", parse_results_page)
+        pages = first["pages"]
+        if limit and limit > 0 and first["entries"]:
+            pages = min(pages, -(-limit // len(first["entries"])))
+        rest = await asyncio.gather(*(fetch_parsed(f"/jam/{jam}/results?page={page}", parse_results_page) for page in range(2, pages + 1)))
+
+        entries = {}
+        for page in [first] + rest:
+            for entry in page["entries"]:
+                entries.setdefault(entry["entry_id"], entry)
+        entries = list(entries.values())[:limit] if limit and limit > 0 else list(entries.values())
+        instrument.add_rows(len(entries))
+
+        print(f"Fetching {len(entries)} entry pages for {jam}...")
+        details = await asyncio.gather(*(fetch_parsed(entry["path"], parse_entry_page) for entry in entries))
+    finally:
+        fetcher.close()
+        if pool:
+            pool.shutdown()
+
+    authors = load_author_ids(author_file)
+    rows = []
+    for position, (entry, detail) in enumerate(zip(entries, details), 1):
+        overall = {**entry["criteria"], **detail["criteria"]}.get("overall")
+        rows.append(entry_row(entry, detail, event_id, overall[0] if overall and overall[0] else position, authors))
+    save_author_ids(authors, author_file)
+
+    filename = f"{output_file}_{event_id}{storage.FORMATS[fmt]}"
+    print(f"Saving {len(rows)} entries of {jam} (event {event_id}) to {filename}...")
+    if fmt == "csv":
+        save_to_csv(filename, rows, schema.SCORE_COLUMNS)
+    else:
+        rows.sort(key=lambda x: x["game_position"])
+        storage.save_games(filename, rows, schema.SCORE_COLUMNS)
+    return filename
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest itch.io jam results as an event file next to the Ludum Dare ones.")
+    parser.add_argument("jam", type=str, nargs="+", help="Jam slugs, as in https://itch.io/jam/<jam>/results")
+    parser.add_argument("--event_id", type=int, nargs="+", default=None, help="ludum_dare_version of each jam (default: derived from the slug)")
+    parser.add_argument("--limit", type=int, default=0, help="Number of entries to ingest (0 ingests every ranked entry)")
+    parser.add_argument("--output_file", type=str, default="ludum_dare_games", help="Output file prefix, the default lets author.py merge the jam")
+    parser.add_argument("--format", type=str, default="csv", choices=list(storage.FORMATS), help="Output format")
+    parser.add_argument("--rate", type=float, default=5, help="Global requests per second (0 disables the limit)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum requests in flight")
+    parser.add_argument("--workers", type=int, default=None, help="HTML parser processes (default: every core)")
+    parser.add_argument("--base_url", type=str, default=ITCH_BASE, help="Site root, e.g. a local server of saved pages")
+    parser.add_argument("--cache_dir", type=str, default=".http_cache", help="On-disk response cache directory")
+    parser.add_argument("--cache_ttl", type=float, default=3600, help="Seconds before cached pages expire")
+    parser.add_argument("--no_cache", action="store_true", help="Disable the response cache")
+    parser.add_argument("--offline", action="store_true", help="Replay from the cache only, zero network calls")
+    parser.add_argument("--author_file", type=str, default=AUTHOR_IDS_FILE, help="itch.io user -> author id table, shared by every jam")
+    args = parser.parse_args()
+
+    if args.event_id and len(args.event_id) != len(args.jam):
+        parser.error("give one --event_id per jam")
+    cache = None if args.no_cache else ResponseCache(args.cache_dir, args.cache_ttl, offline=args.offline)
+    for jam, event_id in zip(args.jam, args.event_id or [None] * len(args.jam)):
+        asyncio.run(ingest_jam(jam, event_id, args.limit, args.output_file, args.rate, args.concurrency, args.base_url,
+                               cache, args.workers, args.format, args.author_file))
+    print("Done!")
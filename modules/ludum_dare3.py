@@ -1,39 +1,213 @@
 import requests
+from urllib3.util.retry import Retry
+import asyncio
 import csv
 import time
+import os
 import re
 import argparse
+import instrument
+from http_cache import ResponseCache, CacheMiss
+from scrape_manifest import ScrapeManifest
+import schema
+import storage
+
+API_BASE = "https://api.ldjam.com"
+FEED_PAGE_SIZE = 200  # Entries per feed call
+DETAILS_CHUNK_SIZE = 50  # Game ids per node2/get call, keeps URLs short
+# Events up to this one have final results, so their responses are cached
+# for CLOSED_EVENT_TTL instead of the short TTL of open events. Bump it once
+# an event's results are out, or set LDJAM_LAST_CLOSED_EVENT (--closed_through
+# overrides both).
+LAST_CLOSED_EVENT = int(os.environ.get("LDJAM_LAST_CLOSED_EVENT", 56))
+# Long, as results are final, but finite: authors still edit descriptions and
+# links of past entries, and a refresh must see their new `modified` values
+CLOSED_EVENT_TTL = 7 * 24 * 3600
+
+# Rate limiting, server errors and dropped connections are retried with
+# exponential backoff (honouring Retry-After); the retries show up in the
+# HTTP metrics of the stage
+RETRY = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), raise_on_status=False)
+
+def _session_with_retries(pool_size=10):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=RETRY)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+_session = _session_with_retries()
 
 def extract_unique_links(text):
     # Regex pattern to match URLs
     url_pattern = r'https?://[^\s)"]+'
     links = re.findall(url_pattern, text)
-    
+
     # Return unique links
     return list(set(links))
 
-def fetch_json(url):
-    """Fetch JSON data from a given URL."""
-    response = requests.get(url)
+def _fetch(url, parse, session=None, cache=None, ttl=None):
+    if cache:
+        data = cache.get(url)
+        if data is not None:
+            instrument.record_cache_hit()
+            return data
+        if cache.offline:
+            raise CacheMiss(url)
+
+    start = time.perf_counter()
+    try:
+        response = (session or _session).get(url, timeout=30)
+    except requests.RequestException:
+        instrument.record_http(time.perf_counter() - start, error=True)
+        raise
+    retries = getattr(getattr(response.raw, "retries", None), "history", ())
+    instrument.record_http(time.perf_counter() - start, len(response.content), response.status_code, len(retries), error=not response.ok)
     response.raise_for_status()
-    return response.json()
+    data = parse(response)
+
+    if cache:
+        cache.put(url, data, ttl)
+    return data
+
+def fetch_json(url, session=None, cache=None, ttl=None):
+    """Fetch JSON data from a given URL, reusing a pooled session and an optional on-disk cache."""
+    return _fetch(url, lambda response: response.json(), session, cache, ttl)
+
+def fetch_text(url, session=None, cache=None, ttl=None):
+    """Fetch a page (e.g. HTML) as text, with the same session and cache handling as fetch_json."""
+    return _fetch(url, lambda response: response.text, session, cache, ttl)
+
+class TokenBucket:
+    """
+    Global requests-per-second budget shared by every concurrent fetch.
+
+    Args:
+        rate (float): Tokens added per second
+        capacity (float): Maximum burst size, defaults to one second of tokens
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and consume it."""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class Fetcher:
+    """
+    Async fetch engine: one pooled HTTP session, bounded concurrency and a
+    token-bucket rate limit. Create one per asyncio.run().
+
+    Args:
+        rate (float): Requests per second across all tasks (None or 0 disables the limit)
+        concurrency (int): Maximum requests in flight
+        base_url (str): API root, override to point at a local stub server
+        cache (ResponseCache): Optional on-disk response cache
+    """
+    def __init__(self, rate=5, concurrency=8, base_url=API_BASE, cache=None):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.session = _session_with_retries(concurrency)
+        self.bucket = TokenBucket(rate) if rate else None
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def _fetch(self, path, fetch, ttl=None, refresh=False):
+        url = f"{self.base_url}{path}"
+        if self.cache and (self.cache.offline or not refresh):
+            data = self.cache.get(url)
+            if data is not None:
+                instrument.record_cache_hit()
+                return data
+            if self.cache.offline:
+                raise CacheMiss(url)
+
+        async with self.semaphore:
+            if self.bucket:
+                await self.bucket.acquire()
+            data = await asyncio.to_thread(fetch, url, self.session)
+
+        if self.cache:
+            self.cache.put(url, data, ttl)
+        return data
+
+    async def fetch_json(self, path, ttl=None, refresh=False):
+        """
+        Fetch a path relative to base_url without blocking the event loop, cache hits skip the rate limit.
+        refresh=True skips the cached copy (unless offline) and stores the new response.
+        """
+        return await self._fetch(path, fetch_json, ttl, refresh)
+
+    async def fetch_text(self, path, ttl=None, refresh=False):
+        """Like fetch_json, for pages that are not JSON (HTML)."""
+        return await self._fetch(path, fetch_text, ttl, refresh)
+
+    def close(self):
+        self.session.close()
+
+async def get_game_results(fetcher, event_id, limit, page_size=FEED_PAGE_SIZE, ttl=None):
+    """
+    Fetch game results for the given Ludum Dare event ID, paging through the
+    feed with offsets until `limit` entries (or the whole event) are covered.
 
-def get_game_results(event_id, limit):
-    """Fetch game results for the given Ludum Dare event ID."""
-    results_url = f"https://api.ldjam.com/vx/node2/walk/1/events/ludum-dare/{event_id}/results/overall/jam?node&parent&_superparent&author"
-    results_data = fetch_json(results_url)
+    Args:
+        limit (int): Maximum number of games, None or <= 0 fetches the entire event
+        page_size (int): Entries requested per feed call
+        ttl (float): Cache TTL for the responses
+
+    Returns:
+        list: (game_id, position, modified) tuples in feed order
+    """
+    results_path = f"/vx/node2/walk/1/events/ludum-dare/{event_id}/results/overall/jam?node&parent&_superparent&author"
+    results_data = await fetcher.fetch_json(results_path, ttl)
     node_id = results_data['node_id']  # Extract node_id
-    
-    games_url = f"https://api.ldjam.com/vx/node/feed/{node_id}/grade-01-result+reverse+parent/item/game/jam?limit={limit}"
-    games_data = fetch_json(games_url)
-    
-    return [(game['id'], game['value']) for game in games_data['feed']]
 
-def get_game_details(game_ids):
+    whole_event = not limit or limit <= 0
+    feed = []
+    while whole_event or len(feed) < limit:
+        page_limit = page_size if whole_event else min(page_size, limit - len(feed))
+        games_path = f"/vx/node/feed/{node_id}/grade-01-result+reverse+parent/item/game/jam?offset={len(feed)}&limit={page_limit}"
+        page = (await fetcher.fetch_json(games_path, ttl)).get('feed', [])
+        feed.extend(page)
+        if len(page) < page_limit:
+            break  # Short page: end of the event
+
+    return [(game['id'], game['value'], game.get('modified')) for game in feed]
+
+async def get_nodes(fetcher, node_ids, chunk_size=DETAILS_CHUNK_SIZE, ttl=None, on_chunk=None, refresh=False):
+    """
+    Fetch nodes (games, users) in parallel, bounded-size node2/get chunks, keeping the input order.
+
+    Args:
+        on_chunk (callable): Called with each chunk's nodes as soon as it arrives (checkpointing)
+        refresh (bool): Skip cached responses, for nodes known to have changed
+    """
+    async def fetch_chunk(chunk):
+        response = await fetcher.fetch_json(f"/vx/node2/get/{'+'.join(map(str, chunk))}", ttl, refresh)
+        if on_chunk:
+            on_chunk(response.get('node', []))
+        return response
+
+    chunks = [node_ids[i:i + chunk_size] for i in range(0, len(node_ids), chunk_size)]
+    responses = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+
+    nodes = {node['id']: node for response in responses for node in response.get('node', [])}
+    return [nodes[node_id] for node_id in node_ids if node_id in nodes]
+
+async def get_game_details(fetcher, game_ids, chunk_size=DETAILS_CHUNK_SIZE, ttl=None, on_chunk=None, refresh=False):
     """Fetch details for a list of game IDs."""
-    ids_str = '+'.join(map(str, game_ids))
-    details_url = f"https://api.ldjam.com/vx/node2/get/{ids_str}"
-    return fetch_json(details_url)['node']
+    return await get_nodes(fetcher, game_ids, chunk_size, ttl, on_chunk, refresh)
 
 def save_to_csv(filename, game_data, magic_keys):
     # print(game_data)
@@ -41,76 +215,131 @@ def save_to_csv(filename, game_data, magic_keys):
     game_data.sort(key=lambda x: x["game_position"])
 
     """Save game data to a CSV file."""
-    headers = [
-        "id", "name", "author", "team_size", "slug", "published", "created", "modified", "comments",
-        "game_position", "ludum_dare_version", "data_authors", "game_link", "links_body"
-    ] + magic_keys
-    
+    headers = schema.GAME_COLUMNS + magic_keys
+
     with open(filename, "w", newline="", encoding="utf-8") as file:
         writer = csv.DictWriter(file, fieldnames=headers)
         writer.writeheader()
         for game in game_data:
             writer.writerow(game)
 
-def main(event_id=48, limit=200, output_file="ludum_dare_games"):
-    """Main function to fetch and save Ludum Dare game data."""
-    print(f"Fetching top {limit} games for Ludum Dare event {event_id}...")
-    game_results = get_game_results(event_id, limit)
+def process_game(game, event_id, game_positions):
+    """Flatten one game node into a CSV row."""
+    magic_data = game.get("magic", {})
+    authors = game.get("meta", {}).get("author", [])
+
+    game_id = game.get("id", "")
+    return {
+        "id": game.get("id", ""),
+        "name": game.get("name", ""),
+        "author": authors,
+        "team_size": len(authors),
+
+        "game_position": game_positions.get(game_id, ""),  # Append game position
+
+        "slug": game.get("slug", ""),
+        "published": game.get("published", ""),
+        "created": game.get("created", ""),
+        "modified": game.get("modified", ""),
+        "game_link": game.get("path", ""),
+        "comments": game.get("comments", ""),
+        "ludum_dare_version": event_id,
+        **magic_data,
+        "data_authors": f"https://api.ldjam.com/vx/node2/get/{'+'.join(map(str, authors))}",
+        "links_body": extract_unique_links(game.get("body", "")),
+    }
+
+async def scrape_event(fetcher, event_id, limit, output_file, closed_through=LAST_CLOSED_EVENT, incremental=True, fmt="csv", closed_ttl=CLOSED_EVENT_TTL):
+    """
+    Fetch, process and save a single event as CSV, Parquet or Arrow, responses
+    of closed events are cached for closed_ttl seconds.
+
+    With incremental=True only games whose `modified` differs from the event
+    manifest are re-fetched, and every detail chunk is checkpointed to the
+    manifest so an interrupted run resumes where it stopped. Games edited
+    since the manifest bypass the response cache, which may still hold
+    their old version.
+    """
+    ttl = closed_ttl if closed_through is not None and event_id <= closed_through else None
+    print(f"Fetching {f'top {limit}' if limit and limit > 0 else 'all'} games for Ludum Dare event {event_id}...")
+    game_results = await get_game_results(fetcher, event_id, limit, ttl=ttl)
     game_ids = [game_feed[0] for game_feed in game_results]
+    instrument.add_rows(len(game_ids))
     game_positions = {game_feed[0]: game_feed[1] for game_feed in game_results}  # Store positions in a dict
 
-    
-    print("Fetching game details...")
-    game_details = get_game_details(game_ids)
-    
-    processed_data = []
+    manifest_path = f"{output_file}_{event_id}.manifest.jsonl"
+    manifest = ScrapeManifest.load(manifest_path) if incremental else ScrapeManifest(manifest_path)
+    if not incremental and os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    stale_ids = [game_id for game_id, _, modified in game_results if not manifest.is_current(game_id, modified)]
+    unversioned = sum(modified is None for _, _, modified in game_results)
+    if not incremental:
+        print(f"Full refresh of event {event_id}: the manifest is ignored and every game re-fetched")
+    elif not manifest.games:
+        print(f"No scrape manifest for event {event_id} yet, every game is fetched")
+    elif unversioned:
+        print(f"{unversioned} of {len(game_results)} feed entries of event {event_id} have no `modified` value, they are re-fetched on every run")
 
+    print(f"Fetching game details for event {event_id} ({len(stale_ids)} of {len(game_ids)} changed)...")
+    checkpoint = lambda nodes: manifest.checkpoint([process_game(game, event_id, game_positions) for game in nodes])
+    new_ids = [game_id for game_id in stale_ids if game_id not in manifest.games]
+    edited_ids = [game_id for game_id in stale_ids if game_id in manifest.games]  # Cached copies may predate the edit
+    await asyncio.gather(
+        get_game_details(fetcher, new_ids, ttl=ttl, on_chunk=checkpoint),
+        get_game_details(fetcher, edited_ids, ttl=ttl, on_chunk=checkpoint, refresh=True),
+    )
 
+    processed_data = manifest.rows(game_ids)
     magic_keys = set()
-    for game in game_details:
-        magic_data = game.get("magic", {})
-        magic_keys.update(magic_data.keys())
-        authors = game.get("meta", "").get("author", "")
-
-        game_id = game.get("id", "")
-        processed_data.append({
-            "id": game.get("id", ""),
-            "name": game.get("name", ""),
-            "author": authors,
-            "team_size": len(authors),
-
-            "game_position": game_positions.get(game_id, ""),  # Append game position
-            
-            "slug": game.get("slug", ""),
-            "published": game.get("published", ""),
-            "created": game.get("created", ""),
-            "modified": game.get("modified", ""),
-            "game_link": game.get("path", ""),
-            "comments": game.get("comments", ""),
-            "ludum_dare_version": event_id,
-            **magic_data,
-            "data_authors": f"https://api.ldjam.com/vx/node2/get/{'+'.join(map(str, authors))}",
-            "links_body": extract_unique_links(game.get("body", "")),
-        })
-        time.sleep(0.2)  # Rate limiting
-    
-    print(f"Saving data to {output_file}...")
+    for row in processed_data:
+        row["game_position"] = game_positions[row["id"]]  # Positions can move without a node edit
+        magic_keys.update(key for key in row if key not in schema.GAME_COLUMNS)
+    manifest.compact(game_ids)
+
+    filename = f"{output_file}_{event_id}{storage.FORMATS[fmt]}"
+    print(f"Saving data to {filename}...")
 
     magic_keys = sorted(magic_keys)  # Ensure consistent column order
-    save_to_csv(f"{output_file}_{event_id}.csv", processed_data, magic_keys)
+    if fmt == "csv":
+        save_to_csv(filename, processed_data, magic_keys)
+    else:
+        processed_data.sort(key=lambda x: x["game_position"])
+        storage.save_games(filename, processed_data, magic_keys)
+    return filename
+
+@instrument.timed("scrape")
+async def scrape_events(event_ids, limit=200, output_file="ludum_dare_games", rate=5, concurrency=8, base_url=API_BASE, cache=None, closed_through=LAST_CLOSED_EVENT, incremental=True, fmt="csv", closed_ttl=CLOSED_EVENT_TTL):
+    """Scrape several events concurrently under one shared session, rate limit and cache."""
+    fetcher = Fetcher(rate=rate, concurrency=concurrency, base_url=base_url, cache=cache)
+    try:
+        return await asyncio.gather(*(scrape_event(fetcher, event_id, limit, output_file, closed_through, incremental, fmt, closed_ttl) for event_id in event_ids))
+    finally:
+        fetcher.close()
+
+def main(event_id=48, limit=200, output_file="ludum_dare_games", rate=5, concurrency=8, base_url=API_BASE, cache=None):
+    """Main function to fetch and save Ludum Dare game data."""
+    asyncio.run(scrape_events([event_id], limit, output_file, rate, concurrency, base_url, cache))
     print("Done!")
 
 if __name__ == "__main__":
-    # parser = argparse.ArgumentParser(description="Fetch Ludum Dare game data.")
-    # parser.add_argument("--event_id", type=int, default=48, help="Ludum Dare event ID >=38 https://ldjam.com/events/ludum-dare/")
-    # parser.add_argument("--limit", type=int, default=200, help="Number of games to fetch")
-    # parser.add_argument("--output_file", type=str, default="ludum_dare_games.csv", help="Output CSV file")
+    parser = argparse.ArgumentParser(description="Fetch Ludum Dare game data.")
+    parser.add_argument("--event_id", type=int, nargs="+", default=list(range(50-6, 50)), help="Ludum Dare event IDs >=38 https://ldjam.com/events/ludum-dare/")
+    parser.add_argument("--limit", type=int, default=200, help="Number of games to fetch (0 fetches the entire event)")
+    parser.add_argument("--output_file", type=str, default="ludum_dare_games", help="Output file prefix")
+    parser.add_argument("--format", type=str, default="csv", choices=list(storage.FORMATS), help="Output format, parquet/arrow store author as list<int64>")
+    parser.add_argument("--rate", type=float, default=5, help="Global requests per second (0 disables the limit)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum requests in flight")
+    parser.add_argument("--base_url", type=str, default=API_BASE, help="API root, e.g. a local stub server")
+    parser.add_argument("--cache_dir", type=str, default=".http_cache", help="On-disk response cache directory")
+    parser.add_argument("--cache_ttl", type=float, default=3600, help="Seconds before cached responses of open events expire")
+    parser.add_argument("--closed_through", type=int, default=LAST_CLOSED_EVENT, help="Events up to this ID are final and cached for --closed_ttl (default: LDJAM_LAST_CLOSED_EVENT or %(default)s)")
+    parser.add_argument("--closed_ttl", type=float, default=CLOSED_EVENT_TTL, help="Seconds before cached responses of closed events expire ('inf' never expires them)")
+    parser.add_argument("--no_cache", action="store_true", help="Disable the response cache")
+    parser.add_argument("--offline", action="store_true", help="Replay from the cache only, zero network calls")
+    parser.add_argument("--full_refresh", action="store_true", help="Ignore the scrape manifests and re-fetch every game")
 
-    # args = parser.parse_args()
-    
-    # main(event_id=args.event_id, limit=args.limit, output_file=args.output_file)
-
-    for num in range(50-6, 50):  # 57 because range() excludes the last number
-        main(event_id=num)
-        time.sleep(100)
+    args = parser.parse_args()
 
+    cache = None if args.no_cache else ResponseCache(args.cache_dir, args.cache_ttl, offline=args.offline)
+    asyncio.run(scrape_events(args.event_id, args.limit, args.output_file, args.rate, args.concurrency, args.base_url, cache, args.closed_through, not args.full_refresh, args.format, args.closed_ttl))
+    print("Done!")
@@ -0,0 +1,299 @@
+import argparse
+import ast
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import author
+import author_dup
+import author_index
+import instrument
+import rank_author
+import rank_author1
+import storage
+from author_enrich import AUTHORS_FILE, ITCH_AUTHORS_FILE, join_author_profiles
+from ludum_dare3 import API_BASE, CLOSED_EVENT_TTL, LAST_CLOSED_EVENT, scrape_events
+from http_cache import ResponseCache
+
+STATE_FILE = ".pipeline_state.json"
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def project_modules(*modules):
+    """
+    The given modules and every module of this directory they import,
+    directly or through each other, so a stage's fingerprint covers all the
+    code it runs.
+
+    Returns:
+        list: Module names, sorted
+    """
+    found, pending = set(), list(modules)
+    while pending:
+        module = pending.pop()
+        path = os.path.join(MODULE_DIR, f"{module}.py")
+        if module in found or not os.path.exists(path):  # Standard library and third-party modules
+            continue
+        found.add(module)
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name.split(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module.split(".")[0])
+    return sorted(found)
+
+def _digest_json(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+class Stage:
+    """
+    One pipeline step.
+
+    Args:
+        name (str): Stage name
+        func (callable): func(results) -> in-memory result, results gives the
+            result of each dependency (loaded from disk when it was skipped)
+        deps (list): Names of the stages this one consumes
+        inputs (callable): Returns the input files read directly (not via deps)
+        outputs (list): Files written, the stage reruns when one is missing
+        params (dict): Parameters that change the outputs
+        code (list): Modules whose source is part of the fingerprint, see project_modules
+        load (callable): Reads the result back from outputs for later stages
+        volatile (bool): Always run (e.g. scraping events that are still open)
+    """
+    def __init__(self, name, func, deps=(), inputs=None, outputs=(), params=None, code=(), load=None, volatile=False):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.inputs = inputs or (lambda: [])
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.code = list(code)
+        self.load = load
+        self.volatile = volatile
+
+class Results:
+    """Dependency results of a stage: in memory when the dependency ran, else loaded from its outputs."""
+    def __init__(self, pipeline, stage):
+        self.pipeline = pipeline
+        self.stage = stage
+
+    def __getitem__(self, name):
+        if name not in self.stage.deps:
+            raise KeyError(f"{self.stage.name} does not depend on {name}")
+        return self.pipeline.result(name)
+
+class Pipeline:
+    """
+    Runs stages in dependency order, skipping those whose fingerprint
+    (input file hashes, dependency output hashes, parameters and code) is
+    unchanged since their last successful run. Independent stages run in
+    parallel threads; results are handed to later stages in memory.
+    """
+    def __init__(self, stages, state_file=STATE_FILE, jobs=2, force=False):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_file = state_file
+        self.jobs = jobs
+        self.force = force
+        self.lock = threading.Lock()
+        self.results = {}
+        self.state = {"stages": {}, "files": {}}
+        if os.path.exists(state_file):
+            with open(state_file, encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def log(self, name, message):
+        with self.lock:
+            print(f"[{name}] {message}", flush=True)
+
+    def save_state(self):
+        with self.lock:
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, indent=1)
+            os.replace(tmp_path, self.state_file)
+
+    def file_digest(self, path):
+        """sha256 of a file, rehashed only when its size or mtime changed."""
+        stat = os.stat(path)
+        key = [stat.st_mtime_ns, stat.st_size]
+        with self.lock:
+            cached = self.state["files"].get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        with self.lock:
+            self.state["files"][path] = [key, sha.hexdigest()]
+        return sha.hexdigest()
+
+    def fingerprint(self, stage):
+        code = [os.path.join(MODULE_DIR, f"{module}.py") for module in stage.code]
+        return _digest_json({
+            "params": stage.params,
+            "inputs": {path: self.file_digest(path) for path in sorted(stage.inputs())},
+            "deps": {
+                dep: {path: self.file_digest(path) for path in self.stages[dep].outputs if os.path.exists(path)}
+                for dep in stage.deps
+            },
+            "code": [self.file_digest(path) for path in code],
+        })
+
+    def is_current(self, stage):
+        if self.force or stage.volatile or not all(os.path.exists(path) for path in stage.outputs):
+            return False
+        return self.state["stages"].get(stage.name) == self.fingerprint(stage)
+
+    def result(self, name):
+        with self.lock:
+            if name in self.results:
+                return self.results[name]
+        stage = self.stages[name]
+        value = stage.load() if stage.load else None
+        with self.lock:
+            return self.results.setdefault(name, value)
+
+    def selected(self, targets):
+        """The target stages and everything they depend on."""
+        names, pending = set(), list(targets or self.stages)
+        while pending:
+            name = pending.pop()
+            if name not in names:
+                names.add(name)
+                pending.extend(self.stages[name].deps)
+        return [name for name in self.stages if name in names]
+
+    def _run_stage(self, name):
+        stage = self.stages[name]
+        if self.is_current(stage):
+            self.log(name, "up to date, skipped")
+            instrument.emit({"type": "skip", "stage": f"pipeline.{name}"})
+            return False
+        self.log(name, "running")
+        with instrument.stage(f"pipeline.{name}"):
+            value = stage.func(Results(self, stage))
+        with self.lock:
+            self.results[name] = value
+        fingerprint = self.fingerprint(stage)
+        with self.lock:
+            self.state["stages"][name] = fingerprint
+        self.save_state()
+        self.log(name, "done")
+        return True
+
+    def run(self, targets=None):
+        """
+        Run the target stages (default: all) and their dependencies.
+
+        Returns:
+            dict: {stage name: True if it ran, False if skipped}
+        """
+        names = self.selected(targets)
+        ran, running = {}, {}
+        with ThreadPoolExecutor(max_workers=max(1, self.jobs)) as pool:
+            while len(ran) < len(names):
+                for name in names:
+                    if name not in ran and name not in running.values() and all(dep in ran for dep in self.stages[name].deps if dep in names):
+                        running[pool.submit(self._run_stage, name)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ran[running.pop(future)] = future.result()
+        return ran
+
+def build_stages(event_ids=None, limit=200, prefix="ludum_dare_games", fmt="csv", base_url=API_BASE, cache_dir=".http_cache",
+                 closed_through=LAST_CLOSED_EVENT, workers=1, min_events=2, merged_file="merged_authors_with_files.csv"):
+    """
+    scrape -> merge -> (dedup, rank, rank1). scrape is only part of the
+    pipeline when event_ids are given; otherwise the existing event files are used.
+    """
+    stages = []
+    merge_deps = []
+
+    if event_ids:
+        def scrape(results):
+            cache = ResponseCache(cache_dir)
+            asyncio.run(scrape_events(event_ids, limit, prefix, base_url=base_url, cache=cache, closed_through=closed_through, fmt=fmt))
+        stages.append(Stage(
+            "scrape", scrape,
+            outputs=[f"{prefix}_{event_id}{storage.FORMATS[fmt]}" for event_id in event_ids],
+            # The period number changes once per CLOSED_EVENT_TTL, so closed events are re-checked for edits
+            params={"event_ids": event_ids, "limit": limit, "fmt": fmt, "base_url": base_url, "period": int(time.time() // CLOSED_EVENT_TTL)},
+            code=project_modules("ludum_dare3"),
+            volatile=any(event_id > closed_through for event_id in event_ids),
+        ))
+        merge_deps.append("scrape")
+
+    event_files = lambda: storage.game_files(prefix)
+    author_table = lambda: [path for path in (AUTHORS_FILE, ITCH_AUTHORS_FILE) if os.path.exists(path)]  # Joined into the rankings
+
+    def merge(results):
+        files = event_files()
+        merged = author.merge_authors(files, workers)
+        storage.write_table(merged, merged_file)
+        index = author_index.AuthorIndex()
+        index.update(files, merged=merged)
+        index.close()
+        return merged
+
+    def dedup(results):
+        author_dup.extract_duplicates_to_csv(event_files(), "duplicate_authors_teams.csv", workers, min_events)
+
+    def rank(results):
+        ranked_authors, legend = rank_author.calculate_author_rank(results["merge"])
+        rank_author.save_rankings(ranked_authors, legend)
+        return ranked_authors
+
+    def rank1(results):
+        ranked_authors = rank_author1.aggregate_author_rankings(results["merge"])
+        join_author_profiles(ranked_authors).to_csv("author_rankings1.csv", index=False)
+        return ranked_authors
+
+    stages += [
+        Stage("merge", merge, deps=merge_deps, inputs=event_files, outputs=[merged_file],
+              params={"merged_file": merged_file}, code=project_modules("author", "author_index"),
+              load=lambda: storage.read_table(merged_file)),
+        Stage("dedup", dedup, deps=merge_deps, inputs=event_files, outputs=["duplicate_authors_teams.csv"],
+              params={"min_events": min_events}, code=project_modules("author_dup")),
+        Stage("rank", rank, deps=["merge"], inputs=author_table, outputs=["ranked_authors_tiered_weighting.csv", "ranking_legend.txt"],
+              code=project_modules("rank_author")),
+        Stage("rank1", rank1, deps=["merge"], inputs=author_table, outputs=["author_rankings1.csv"],
+              code=project_modules("rank_author1")),
+    ]
+    return stages
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run scrape -> merge -> dedup -> rank, skipping up-to-date stages.")
+    parser.add_argument("stages", nargs="*", help="Stages to run with their dependencies (default: all)")
+    parser.add_argument("--event_id", type=int, nargs="+", default=None, help="Scrape these events first (default: use existing event files)")
+    parser.add_argument("--limit", type=int, default=200, help="Number of games to fetch per event (0 fetches the entire event)")
+    parser.add_argument("--format", type=str, default="csv", choices=list(storage.FORMATS), help="Scraped event file format")
+    parser.add_argument("--base_url", type=str, default=API_BASE, help="API root, e.g. a local stub server")
+    parser.add_argument("--closed_through", type=int, default=LAST_CLOSED_EVENT, help="Events up to this ID are final and re-scraped once per cache period, later ones on every run (default: LDJAM_LAST_CLOSED_EVENT or %(default)s)")
+    parser.add_argument("--min_events", type=int, default=2, help="dedup: authors in at least this many events")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for parsing event files (default: every core)")
+    parser.add_argument("--jobs", type=int, default=2, help="Independent stages run at the same time")
+    parser.add_argument("--force", action="store_true", help="Run every selected stage even when up to date")
+    parser.add_argument("--state_file", type=str, default=STATE_FILE, help="Stage fingerprints of the last runs")
+    parser.add_argument("--metrics_file", type=str, default=None, help="Append per-stage metrics as JSON lines (\"-\" for stderr)")
+    parser.add_argument("--profile", action="store_true", help="cProfile each stage, .prof files go to profiles/")
+    parser.add_argument("--trace_memory", action="store_true", help="tracemalloc peak and top allocation sites per stage")
+    args = parser.parse_args()
+
+    if args.metrics_file or args.profile or args.trace_memory:
+        instrument.configure(args.metrics_file or "pipeline_metrics.jsonl", args.profile, args.trace_memory)
+
+    stages = build_stages(args.event_id, args.limit, fmt=args.format, base_url=args.base_url,
+                          closed_through=args.closed_through, workers=args.workers, min_events=args.min_events)
+    pipeline = Pipeline(stages, args.state_file, jobs=args.jobs, force=args.force)
+    unknown = set(args.stages) - set(pipeline.stages)
+    if unknown:
+        parser.error(f"unknown stages {sorted(unknown)}, choose from {list(pipeline.stages)}")
+
+    ran = pipeline.run(args.stages or None)
+    print(f"Ran {sum(ran.values())} of {len(ran)} stages")
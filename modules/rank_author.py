@@ -1,6 +1,87 @@
 import pandas as pd
 import numpy as np
+import argparse
+from author_enrich import join_author_profiles
+import storage
+import schema
+import instrument
+from schema import CATEGORY_MAPPING
 
+# Columns of the merged author table used for ranking
+input_columns = (
+    ['author', 'count', 'team_size', 'game_position', 'game_link'] +
+    schema.ENGAGEMENT_COLUMNS + schema.AVERAGE_COLUMNS + schema.RESULT_COLUMNS
+)
+
+# Component weights
+component_weights = {
+    'participation': 0.10,
+    'community': 0.10,
+    'performance': 0.80  # Increased weight for performance
+}
+
+# Position tiers: rank <= 15, <= 25, <= 50, <= 100, worse or unranked
+tier_thresholds = np.array([15, 25, 50, 100])
+tier_multipliers = np.array([12, 9, 3, 1.0, 0.7])
+
+def position_matrices(df):
+    """
+    Dense (rows x 8) float arrays of category ranks and averages, NaN where missing.
+
+    Returns:
+        ndarray: ranks, columns in CATEGORY_MAPPING order
+        ndarray: averages, columns in CATEGORY_MAPPING order
+    """
+    ranks = schema.grade_matrix(df, schema.RESULT_COLUMNS)
+    averages = schema.grade_matrix(df, schema.AVERAGE_COLUMNS)
+    return ranks, averages
+
+def position_multipliers(ranks, thresholds=tier_thresholds, multipliers=tier_multipliers):
+    """
+    Tier multiplier of every rank, NaN ranks fall in the last tier.
+
+    Ranks are whole numbers, so the tiers of 0..last threshold + 1 are found
+    once and every rank is a lookup into them, capped at the last tier.
+    """
+    top = int(np.max(thresholds)) + 1
+    lookup = multipliers[np.searchsorted(thresholds, np.arange(top + 1), side='left')]
+    return lookup[np.fmin(ranks, top).astype(np.intp)]  # fmin turns NaN into top
+
+def convert_numeric(df):
+    """Shallow copy of df with the grade columns converted to numbers, columns are replaced rather than modified in place."""
+    ranked_df = df.copy(deep=False)
+    
+    numeric_cols = schema.ENGAGEMENT_COLUMNS + schema.AVERAGE_COLUMNS + schema.RESULT_COLUMNS
+    
+    for col in numeric_cols:
+        if col in ranked_df.columns and not pd.api.types.is_numeric_dtype(ranked_df[col]):
+            ranked_df[col] = pd.to_numeric(ranked_df[col], errors='coerce')
+    return ranked_df
+
+def component_scores(ranked_df):
+    """
+    Participation (entry count, team_size neutral) and community engagement
+    scores of every row.
+    
+    Returns:
+        ndarray: participation score
+        ndarray: community score
+    """
+    participation_score = ranked_df['count'].fillna(1).clip(0, 5).to_numpy(dtype=np.float64)
+    
+    community_cols = ['cool', 'given']
+    available_community = [c for c in community_cols if c in ranked_df.columns]
+    if not available_community:
+        return participation_score, np.zeros(len(ranked_df))
+    
+    # Mean of the values present, 0 without any
+    community = ranked_df[available_community].to_numpy(dtype=np.float64, na_value=np.nan)
+    present = (~np.isnan(community)).sum(axis=1)
+    with np.errstate(invalid='ignore'):
+        community_score = np.where(present > 0, np.nansum(community, axis=1) / present, 0.0)
+    return participation_score, community_score
+
+@instrument.timed("rank", rows=lambda result, df: len(df))
 def calculate_author_rank(df):
     """
     Calculate author rankings with:
@@ -17,16 +98,7 @@ def calculate_author_rank(df):
             'top_50': {'threshold': 50, 'weight_multiplier': 1.1},
             'others': {'weight_multiplier': 1.0}
         },
-        'category_weights': {
-            'Fun': 0.35,      # Highest priority
-            'Overall': 0.30,   # Second priority
-            'Mood': 0.12,     # Third priority
-            'Graphics': 0.10,  # Fourth priority
-            'Innovation': 0.05,
-            'Audio': 0.04,
-            'Theme': 0.03,
-            'Humor': 0.01
-        },
+        'category_weights': schema.CATEGORY_WEIGHTS,
         'scoring_notes': [
             'Position tiers multiply the base category scores',
             'Top 15 positions get 3x multiplier',
@@ -37,112 +109,47 @@ def calculate_author_rank(df):
         ]
     }
     
-    # Make a copy of the dataframe
-    ranked_df = df.copy()
-    
-    # Convert numeric columns
-    numeric_cols = [
-        'cool', 'feedback', 'given', 'grade', 'smart',
-        'grade-01-average', 'grade-02-average', 'grade-03-average',
-        'grade-04-average', 'grade-05-average', 'grade-06-average',
-        'grade-07-average', 'grade-08-average',
-        'grade-01-result', 'grade-02-result', 'grade-03-result',
-        'grade-04-result', 'grade-05-result', 'grade-06-result',
-        'grade-07-result', 'grade-08-result'
-    ]
+    ranked_df = convert_numeric(df)
     
-    for col in numeric_cols:
-        if col in ranked_df.columns:
-            ranked_df[col] = pd.to_numeric(ranked_df[col], errors='coerce')
-    
-    # Create game_position array from all result columns
-    result_columns = [
-        'grade-01-result', 'grade-02-result'
-    ]
-    
-    ranked_df['game_position'] = ranked_df[result_columns].values.tolist()
-    
-    # Component weights
-    weights = {
-        'participation': 0.10,
-        'community': 0.10,
-        'performance': 0.80  # Increased weight for performance
-    }
-    
-    # 1. Participation Score (team_size neutral)
-    ranked_df['participation_score'] = ranked_df['count'].fillna(1).clip(0, 5)
-    
-    # 2. Community Engagement Score
-    community_cols = ['cool', 'given']
-    available_community = [c for c in community_cols if c in ranked_df.columns]
-    ranked_df['community_score'] = (
-        ranked_df[available_community].mean(axis=1).fillna(0) if available_community else 0
-    )
+    # 1. Participation Score and 2. Community Engagement Score
+    participation_score, community_score = component_scores(ranked_df)
     
     # 3. Performance Score with tiered position weighting
-    category_mapping = {
-        'grade-01': 'Overall',
-        'grade-02': 'Fun',
-        'grade-03': 'Innovation',
-        'grade-04': 'Theme',
-        'grade-05': 'Graphics',
-        'grade-06': 'Audio',
-        'grade-07': 'Humor',
-        'grade-08': 'Mood'
-    }
+    ranks, averages = position_matrices(ranked_df)
     
-    # Calculate base scores for each category
-    for prefix, category in category_mapping.items():
-        avg_col = f'{prefix}-average'
-        
-        if avg_col in ranked_df.columns:
-            # Normalize average score (0-5 → 0-1)
-            ranked_df[f'{category}_avg_score'] = ranked_df[avg_col].fillna(0) / 5
-            
-            # Get position from game_position array
-            pos_idx = list(category_mapping.keys()).index(prefix)
-            ranked_df[f'{category}_rank'] = ranked_df['game_position'].apply(
-                lambda x: x[pos_idx] if isinstance(x, list) and len(x) > pos_idx else np.nan
-            )
-            
-            # Apply tiered position multipliers
-            conditions = [
-                (ranked_df[f'{category}_rank'] <= 15),
-                (ranked_df[f'{category}_rank'] <= 25),
-                (ranked_df[f'{category}_rank'] <= 50),
-                (ranked_df[f'{category}_rank'] <= 100),
-                (ranked_df[f'{category}_rank'] > 100) | (ranked_df[f'{category}_rank'].isna())
-            ]
-            multipliers = [12, 9, 3, 1.0, 0.7]
-            ranked_df[f'{category}_position_multiplier'] = np.select(conditions, multipliers)
-            
-            # Combined score (base average × position multiplier)
-            ranked_df[f'{category}_score'] = (
-                ranked_df[f'{category}_avg_score'] * 
-                ranked_df[f'{category}_position_multiplier']
-            )
-    
-    # Calculate weighted performance score
-    performance_score = 0
-    total_weight = 0
-    for category, weight in scoring_legend['category_weights'].items():
-        performance_score += ranked_df.get(f'{category}_score', 0) * weight
-        total_weight += weight
-    
-    ranked_df['performance_score'] = (performance_score / total_weight if total_weight > 0 else 0)
+    # Normalize average score (0-5 -> 0-1) and apply tiered position multipliers
+    category_scores = np.nan_to_num(averages, nan=0.0)
+    category_scores /= 5
+    category_scores *= position_multipliers(ranks)
+    
+    # Weighted performance score as one matrix-vector product
+    weight_vector = np.array([schema.CATEGORY_WEIGHTS[category] for category in CATEGORY_MAPPING.values()])
+    performance_score = category_scores @ weight_vector / weight_vector.sum()
     
     # Final composite score (0-100)
-    ranked_df['composite_score'] = (
-        weights['participation'] * ranked_df['participation_score'] +
-        weights['community'] * ranked_df['community_score'] +
-        weights['performance'] * ranked_df['performance_score']
+    composite_score = (
+        component_weights['participation'] * participation_score +
+        component_weights['community'] * community_score +
+        component_weights['performance'] * performance_score
     ) * 100
     
-    # Add rank column
-    ranked_df['rank'] = ranked_df['composite_score'].rank(ascending=False, method='min').astype(int)
-    
-    # Sort and prepare output
-    ranked_df = ranked_df.sort_values('rank')
+    # Sort by score (stable, ties keep input order) and add a 'min' rank:
+    # tied scores are adjacent once sorted and share the rank of the first one
+    order = np.argsort(-composite_score, kind='stable')
+    sorted_scores = composite_score[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_scores[1:] != sorted_scores[:-1]
+    
+    computed = {
+        'rank': np.maximum.accumulate(np.where(first, np.arange(1, len(order) + 1), 0)),
+        'composite_score': sorted_scores,
+        'performance_score': performance_score[order],
+    }
+    category_scores = category_scores.T.take(order, axis=1)
+    ranks = ranks.T.take(order, axis=1)
+    for j, category in enumerate(CATEGORY_MAPPING.values()):
+        computed[f'{category}_score'] = category_scores[j]
+        computed[f'{category}_rank'] = ranks[j]
     
     # Prepare output columns
     output_columns = [
@@ -150,32 +157,30 @@ def calculate_author_rank(df):
         'grade', 'game_position', 'performance_score', 'game_link'
     ]
     
-    # Add all category scores and positions
+    # Add all category scores, positions and averages
+    prefixes = {category: prefix for prefix, category in CATEGORY_MAPPING.items()}
     for category in scoring_legend['category_weights'].keys():
         output_columns.extend([
             f'{category}_score',
             f'{category}_rank',
-            f'grade-{list(category_mapping.keys())[list(category_mapping.values()).index(category)]}-average'
+            f'{prefixes[category]}-average'
         ])
     
-    # Select available columns
-    available_columns = [col for col in output_columns if col in ranked_df.columns]
+    # Select available columns, reordered once; one frame per column so
+    # nothing is copied again into consolidated blocks
+    index = ranked_df.index[order]
+    ranked_df = pd.concat([
+        pd.DataFrame({col: computed[col] if col in computed else ranked_df[col].array.take(order)}, index=index, copy=False)
+        for col in output_columns if col in computed or col in ranked_df.columns
+    ], axis=1)
     
-    return ranked_df[available_columns], scoring_legend
+    return ranked_df, scoring_legend
 
-# Example usage:
-if __name__ == "__main__":
-    # Load your data
-    df = pd.read_csv("merged_authors_with_files.csv")
-    
-    # Calculate rankings
-    ranked_authors, legend = calculate_author_rank(df)
+def save_rankings(ranked_authors, legend, output_file="ranked_authors_tiered_weighting.csv", legend_file="ranking_legend.txt"):
+    """Write the ranking, with author names when author_enrich.py has been run, and its legend."""
+    join_author_profiles(ranked_authors).to_csv(output_file, index=False)
     
-    # Save results
-    ranked_authors.to_csv("ranked_authors_tiered_weighting.csv", index=False)
-    
-    # Save legend
-    with open("ranking_legend.txt", "w") as f:
+    with open(legend_file, "w") as f:
         f.write("POSITION TIERS:\n")
         for tier, spec in legend['position_tiers'].items():
             if tier != 'others':
@@ -186,6 +191,21 @@ if __name__ == "__main__":
         f.write("\nCATEGORY WEIGHTS:\n")
         for cat, weight in legend['category_weights'].items():
             f.write(f"{cat}: {weight*100:.1f}%\n")
+
+# Example usage:
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank authors with tiered position weighting.")
+    parser.add_argument("--input_file", type=str, default="merged_authors_with_files.csv", help="Merged author table, .csv, .parquet or .arrow")
+    args = parser.parse_args()
+
+    # Load only the columns used for ranking
+    df = storage.read_table(args.input_file, columns=input_columns)
+    
+    # Calculate rankings
+    ranked_authors, legend = calculate_author_rank(df)
+    
+    # Save results (with author names when author_enrich.py has been run) and the legend
+    save_rankings(ranked_authors, legend)
     
     print("Top 10 Authors:")
     print(ranked_authors.head(10)[['rank', 'author', 'composite_score', 'Fun_rank', 'Overall_rank']])
@@ -1,124 +1,97 @@
 import pandas as pd
-from collections import defaultdict
+import numpy as np
+import argparse
+from author_enrich import join_author_profiles
+import storage
+import schema
+import instrument
 
-def calculate_author_rankings(csv_path):
-    # Load the CSV data
-    df = pd.read_csv(csv_path)
-    
-    # Define category mapping and weights
-    category_mapping = {
-        'grade-01': 'Overall',
-        'grade-02': 'Fun',
-        'grade-03': 'Innovation',
-        'grade-04': 'Theme',
-        'grade-05': 'Graphics',
-        'grade-06': 'Audio',
-        'grade-07': 'Humor',
-        'grade-08': 'Mood'
-    }
+# Columns of the merged author table used for ranking
+input_columns = ['author', 'team_size', 'game_link', 'ludum_dare_version'] + schema.GRADE_COLUMNS
+
+def entry_scores(df):
+    """
+    Per-entry values aggregated by the ranking, one row per row of df.
     
-    category_weights = {
-        'Fun': 0.35,
-        'Overall': 0.30,
-        'Mood': 0.12,
-        'Graphics': 0.10,
-        'Innovation': 0.05,
-        'Audio': 0.04,
-        'Theme': 0.03,
-        'Humor': 0.01
-    }
+    Returns:
+        DataFrame: author, entry_score (weighted sum of the non-null averages),
+        team_size, {category}_score (average) and {category}_rank (result,
+        only where the average exists)
+    """
+    categories = schema.CATEGORIES
+    averages = schema.grade_matrix(df, schema.AVERAGE_COLUMNS)
+    results = schema.grade_matrix(df, schema.RESULT_COLUMNS)
+    weights = np.array([schema.CATEGORY_WEIGHTS[category] for category in categories])
     
-    # Prepare data structures to store aggregated author data
-    author_data = defaultdict(lambda: {
-        'total_score': 0,
-        'entries': 0,
-        'average_scores': defaultdict(float),
-        'average_ranks': defaultdict(float),
-        'team_sizes': [],
-        'participations': 0,
-        'game_links': set(),
-        'ludum_dare_versions': set()
+    entries = pd.DataFrame({
+        'author': df['author'].to_numpy(),
+        'entry_score': np.nan_to_num(averages, nan=0.0) @ weights,
+        'team_size': pd.to_numeric(df['team_size'], errors='coerce').to_numpy(dtype=np.float64),
     })
+    scores = pd.DataFrame(averages, columns=[f'{category}_score' for category in categories])
+    ranks = pd.DataFrame(np.where(np.isnan(averages), np.nan, results), columns=[f'{category}_rank' for category in categories])
+    return pd.concat([entries, scores, ranks], axis=1)
+
+@instrument.timed("rank1", rows=lambda result, df: len(df))
+def aggregate_author_rankings(df):
+    """
+    Aggregate the merged author table into one ranked row per author.
+    
+    Category scores and ranks are means over the entries that have that
+    grade, not over every entry of the author.
     
-    # Process each row in the dataframe
-    for _, row in df.iterrows():
-        author = row['author']
-        author_info = author_data[author]
-        
-        # Calculate weighted score for this entry
-        entry_score = 0
-        entry_ranks = {}
-        
-        for grade_key, category in category_mapping.items():
-            avg_key = f"{grade_key}-average"
-            result_key = f"{grade_key}-result"
-            
-            if avg_key in row and pd.notna(row[avg_key]):
-                weight = category_weights[category]
-                entry_score += row[avg_key] * weight
-                
-                # Track average scores and ranks per category
-                author_info['average_scores'][category] += row[avg_key]
-                if result_key in row and pd.notna(row[result_key]):
-                    author_info['average_ranks'][category] += row[result_key]
-        
-        # Update author aggregates
-        author_info['total_score'] += entry_score
-        author_info['entries'] += 1
-        
-        # Track other metadata
-        if pd.notna(row['team_size']):
-            author_info['team_sizes'].append(row['team_size'])
-        if pd.notna(row['game_link']):
-            author_info['game_links'].add(row['game_link'])
-        if pd.notna(row['ludum_dare_version']):
-            author_info['ludum_dare_versions'].add(row['ludum_dare_version'])
+    Args:
+        df (DataFrame): Merged author table (input_columns)
     
-    # Calculate final averages and prepare results
-    results = []
-    for author, data in author_data.items():
-        # Calculate average score across all entries
-        avg_score = data['total_score'] / data['entries']
-        
-        # Calculate average team size
-        avg_team_size = (sum(data['team_sizes']) / len(data['team_sizes'])) if data['team_sizes'] else 0
-        
-        # Calculate average scores and ranks per category
-        category_scores = {}
-        category_ranks = {}
-        for category in category_mapping.values():
-            if data['average_scores'][category] > 0:
-                category_scores[f"{category}_score"] = data['average_scores'][category] / data['entries']
-                category_ranks[f"{category}_rank"] = data['average_ranks'][category] / data['entries']
-        
-        # Prepare result entry
-        result = {
-            'author': author,
-            'overall_score': avg_score,
-            'total_entries': data['entries'],
-            'average_team_size': avg_team_size,
-            'unique_events': len(data['ludum_dare_versions']),
-            'unique_games': len(data['game_links']),
-            **category_scores,
-            **category_ranks,
-            'game_link':data['game_links'],
-            'ludum_events':data['ludum_dare_versions'],
-        }
-        results.append(result)
+    Returns:
+        DataFrame: Authors sorted by rank
+    """
+    categories = schema.CATEGORIES
+    entries = entry_scores(df)
     
-    # Convert to DataFrame and sort by overall score
-    results_df = pd.DataFrame(results)
+    # Single grouped aggregation, authors in order of first appearance
+    results_df = entries.groupby('author', sort=False).agg(
+        overall_score=('entry_score', 'mean'),
+        total_entries=('entry_score', 'size'),
+        average_team_size=('team_size', 'mean'),
+        **{f'{category}_score': (f'{category}_score', 'mean') for category in categories},
+        **{f'{category}_rank': (f'{category}_rank', 'mean') for category in categories},
+    )
+    results_df['average_team_size'] = results_df['average_team_size'].fillna(0)
+    
+    # Distinct events and games per author
+    metadata = df[['author', 'ludum_dare_version', 'game_link']]
+    unique_counts = metadata.groupby('author', sort=False).nunique()
+    results_df.insert(3, 'unique_events', unique_counts['ludum_dare_version'])
+    results_df.insert(4, 'unique_games', unique_counts['game_link'])
+    for column, name in (('game_link', 'game_link'), ('ludum_dare_version', 'ludum_events')):
+        # Distinct pairs first; plain values, since per-group unique() on a categorical is slow
+        pairs = metadata[['author', column]].dropna().drop_duplicates()
+        values = pd.Series(pairs[column].to_numpy(dtype=object), index=pairs['author']).groupby(level=0, sort=False).agg(set)
+        results_df[name] = values.reindex(results_df.index).map(lambda value: value if isinstance(value, set) else set())
+    
+    # Rank by overall score
+    results_df = results_df.reset_index()
     results_df['rank'] = results_df['overall_score'].rank(ascending=False, method='min').astype(int)
-    results_df = results_df.sort_values('rank')
+    results_df = results_df.sort_values('rank', kind='stable')
     
     return results_df
 
+def calculate_author_rankings(csv_path):
+    # Load only the columns used for ranking (.csv, .parquet or .arrow)
+    df = storage.read_table(csv_path, columns=input_columns)
+    return aggregate_author_rankings(df)
+
 # Example usage
 if __name__ == "__main__":
-    ranked_authors = calculate_author_rankings('merged_authors_with_files.csv')
+    parser = argparse.ArgumentParser(description="Rank authors by weighted category averages.")
+    parser.add_argument("--input_file", type=str, default="merged_authors_with_files.csv", help="Merged author table, .csv, .parquet or .arrow")
+    args = parser.parse_args()
+
+    ranked_authors = calculate_author_rankings(args.input_file)
     
-    # Save results to a new CSV
-    ranked_authors.to_csv('author_rankings1.csv', index=False)
+    # Save results to a new CSV, with author names when author_enrich.py has been run
+    join_author_profiles(ranked_authors).to_csv('author_rankings1.csv', index=False)
     
     # Display top authors
     print(ranked_authors.head(10))
\ No newline at end of file
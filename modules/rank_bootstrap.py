@@ -0,0 +1,137 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import rank_author
+import rank_author1
+import storage
+import instrument
+from rank_sweep import rank_columns
+
+BATCH_SIZE = 250  # Resamples per batch (one RNG stream each)
+REDUCERS = {'mean': np.add, 'max': np.maximum}
+
+def entry_values(df, scores='rank_author1'):
+    """
+    One value per entry of the merged author table, the quantity each ranking aggregates.
+
+    Args:
+        df (DataFrame): Merged author table
+        scores (str): 'rank_author1' (entry_score, authors ranked by its mean) or
+            'rank_author' (composite_score, authors ranked by their best entry)
+
+    Returns:
+        ndarray: author id of every entry
+        ndarray: value of every entry
+        str: statistic combining an author's entries, 'mean' or 'max'
+    """
+    if scores == 'rank_author':
+        ranked_df, _ = rank_author.calculate_author_rank(df)
+        return ranked_df['author'].to_numpy(), ranked_df['composite_score'].to_numpy(dtype=np.float64), 'max'
+    entries = rank_author1.entry_scores(df)
+    return entries['author'].to_numpy(), entries['entry_score'].to_numpy(dtype=np.float64), 'mean'
+
+def _resample_ranks(values, starts, counts, statistic, n_resamples, seed):
+    """
+    Ranks of every author in n_resamples bootstrap resamples.
+
+    values holds the entries grouped by author (author g owns
+    values[starts[g]:starts[g] + counts[g]]); each resample redraws, with
+    replacement, as many entries per author as it has.
+
+    Returns:
+        ndarray: (n_resamples x n_authors) 'min' ranks, smallest unsigned int type that fits
+    """
+    rng = np.random.default_rng(seed)
+    owners = np.repeat(np.arange(len(counts)), counts)
+    # Every entry slot of every resample draws one entry of its own author
+    draws = starts[owners] + (rng.random((n_resamples, len(owners))) * counts[owners]).astype(np.int64)
+    sampled = values[draws]
+    author_scores = REDUCERS[statistic].reduceat(sampled, starts, axis=1)
+    if statistic == 'mean':
+        author_scores /= counts
+    return rank_columns(author_scores.T).T.astype(np.min_scalar_type(len(counts)))
+
+@instrument.timed("bootstrap", rows=lambda result, authors, *args, **kwargs: len(authors))
+def bootstrap_ranks(authors, values, statistic='mean', n_resamples=10000, seed=None, workers=1, batch_size=BATCH_SIZE):
+    """
+    Bootstrap the author ranking by resampling each author's entries.
+
+    Resamples run in batches of batch_size, each with its own child seed of
+    seed, so results depend on seed only, not on the worker count.
+
+    Args:
+        authors (ndarray): Author id of every entry
+        values (ndarray): Value of every entry
+        statistic (str): 'mean' or 'max' of an author's entries
+        n_resamples (int): Number of bootstrap resamples
+        seed (int): RNG seed, None for a fresh one
+        workers (int): Worker processes, None uses every core
+
+    Returns:
+        ndarray: Author ids (ascending)
+        ndarray: Point ranks on the original entries
+        ndarray: (n_resamples x n_authors) resampled ranks
+    """
+    ids, codes = np.unique(authors, return_inverse=True)
+    order = np.argsort(codes, kind='stable')
+    values = np.asarray(values, dtype=np.float64)[order]
+    counts = np.bincount(codes, minlength=len(ids))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    point_scores = REDUCERS[statistic].reduceat(values, starts)
+    if statistic == 'mean':
+        point_scores = point_scores / counts
+    point_ranks = rank_columns(point_scores[:, None])[:, 0]
+
+    sizes = [min(batch_size, n_resamples - start) for start in range(0, n_resamples, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(values, starts, counts, statistic, size, child) for size, child in zip(sizes, seeds)]
+
+    workers = workers or os.cpu_count()
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            batches = list(pool.map(_resample_ranks, *zip(*jobs)))
+    else:
+        batches = [_resample_ranks(*job) for job in jobs]
+    resampled = np.concatenate(batches) if batches else np.empty((0, len(ids)), dtype=np.int32)
+    return ids, point_ranks, resampled
+
+def rank_intervals(ids, point_ranks, resampled, confidence=0.95):
+    """
+    Percentile interval of every author's rank.
+
+    Returns:
+        DataFrame: author, rank, rank_low, rank_median, rank_high, sorted by rank
+    """
+    tail = (1 - confidence) / 2 * 100
+    low, median, high = np.percentile(resampled, [tail, 50, 100 - tail], axis=0)
+    intervals = pd.DataFrame({
+        'author': ids,
+        'rank': point_ranks,
+        'rank_low': low,
+        'rank_median': median,
+        'rank_high': high,
+        'interval_width': high - low,
+    })
+    return intervals.sort_values(['rank', 'author'], kind='stable', ignore_index=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals for author ranks.")
+    parser.add_argument("--input_file", type=str, default="merged_authors_with_files.csv", help="Merged author table, .csv, .parquet or .arrow")
+    parser.add_argument("--scores", type=str, default="rank_author1", choices=["rank_author1", "rank_author"], help="Ranking to bootstrap")
+    parser.add_argument("--resamples", type=int, default=10000, help="Number of bootstrap resamples")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Width of the percentile interval")
+    parser.add_argument("--seed", type=int, default=None, help="RNG seed for reproducible intervals")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: every core)")
+    parser.add_argument("--output_file", type=str, default="rank_intervals.csv", help="Per-author rank intervals")
+    args = parser.parse_args()
+
+    columns = rank_author.input_columns if args.scores == "rank_author" else rank_author1.input_columns
+    authors, values, statistic = entry_values(storage.read_table(args.input_file, columns=columns), args.scores)
+    intervals = rank_intervals(*bootstrap_ranks(authors, values, statistic, args.resamples, args.seed, args.workers), args.confidence)
+    intervals.to_csv(args.output_file, index=False)
+
+    print(intervals.head(10))
+    print(f"\nIntervals saved to {args.output_file}")
@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+import pandas as pd
+import schema
+import storage
+
+# Ranking outputs served, by the script that writes them
+RANKING_FILES = {
+    "rank_author": "ranked_authors_tiered_weighting.csv",
+    "rank_author1": "author_rankings1.csv",
+}
+MERGED_FILE = "merged_authors_with_files.csv"
+
+# Per-entry columns of the merged table returned with an author and on event leaderboards
+ENTRY_FIELDS = {
+    'ludum_dare_version': 'event',
+    'game_link': 'game_link',
+    'id': 'id',
+    'game_position': 'game_position',
+    'team_size': 'team_size',
+    'grade-01-average': 'overall_average',
+    'grade-01-result': 'overall_result',
+}
+SET_COLUMNS = ['game_link', 'ludum_events']  # Python set text in author_rankings1.csv, the merged table has the same data
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+POLL_SECONDS = 1.0
+
+def _records(df):
+    """DataFrame rows as JSON-ready dicts, NaN/NA as None, numpy scalars as Python numbers."""
+    df = df.astype(object).where(df.notna(), None)
+    return [
+        {key: value.item() if isinstance(value, np.generic) else value for key, value in row.items()}
+        for row in df.to_dict('records')
+    ]
+
+def _encode(records):
+    return [json.dumps(record, separators=(",", ":")) for record in records]
+
+class RankingSnapshot:
+    """
+    Immutable in-memory copy of the ranking outputs and the merged table,
+    indexed for every query and with each row already JSON encoded, so a
+    request only slices lists and joins strings.
+
+    Args:
+        directory (str): Where the pipeline writes its outputs
+    """
+    def __init__(self, directory=".", version=1):
+        self.version = version
+        self.loaded_at = time.time()
+        self.rankings = {}  # {ranking: [encoded row]}, sorted by rank
+        self.author_rows = {}  # {ranking: {author: [encoded row]}}
+        for name, file in RANKING_FILES.items():
+            path = os.path.join(directory, file)
+            if not os.path.exists(path):
+                continue
+            df = pd.read_csv(path).drop(columns=SET_COLUMNS, errors='ignore')
+            encoded = _encode(_records(df))
+            self.rankings[name] = encoded
+            rows_by_author = {}
+            for author_id, row in zip(df['author'].tolist(), encoded):
+                rows_by_author.setdefault(author_id, []).append(row)
+            self.author_rows[name] = rows_by_author
+
+        self.author_entries = {}  # {author: [encoded entry]}
+        self.events = {}  # {event: [encoded game]}, in leaderboard order
+        path = os.path.join(directory, MERGED_FILE)
+        if os.path.exists(path):
+            merged = storage.read_table(path, columns=['author'] + list(ENTRY_FIELDS))
+            self._index_entries(merged.reindex(columns=['author'] + list(ENTRY_FIELDS)).rename(columns=ENTRY_FIELDS))
+
+    def _index_entries(self, entries):
+        entries = entries.astype({'event': 'Int32'})
+        entries['overall_average'] = entries['overall_average'].astype('float64').round(schema.AVERAGE_DECIMALS)  # float32 -> published decimals
+        for author_id, encoded in zip(entries['author'].tolist(), _encode(_records(entries.drop(columns='author')))):
+            self.author_entries.setdefault(author_id, []).append(encoded)
+
+        # One row per game with its team; game_position when scraped, else the Overall result
+        games = entries.dropna(subset=['event', 'game_link'])
+        authors = games.groupby('game_link', sort=False, observed=True)['author'].agg(list)
+        games = games.drop_duplicates('game_link').drop(columns='author')
+        games['authors'] = authors.reindex(games['game_link']).to_numpy()
+        order = games['game_position'].fillna(games['overall_result'])
+        games = games.assign(order=order.astype('Float64')).sort_values(['event', 'order', 'id'], na_position='last', kind='stable')
+        for event, group in games.drop(columns='order').groupby('event', sort=True):
+            self.events[int(event)] = _encode(_records(group))
+
+    def health(self):
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "rankings": {name: len(rows) for name, rows in self.rankings.items()},
+            "authors": len(self.author_entries),
+            "events": sorted(self.events),
+        }
+
+class RankingStore:
+    """
+    Holds the current snapshot and swaps in a new one when the source files change.
+
+    A reload builds the new snapshot off to the side and replaces the
+    reference in one assignment; requests take the reference once, so each
+    one sees either the old or the new results, never a mix. Files are
+    reloaded once they stop changing between two polls, so a half-written
+    output is not picked up, and a failed load keeps the old snapshot.
+    """
+    def __init__(self, directory=".", poll_seconds=POLL_SECONDS):
+        self.directory = directory
+        self.poll_seconds = poll_seconds
+        self.signature = self.file_signature()
+        self.failed = None  # Signature of files that did not load, retried once they change again
+        self.snapshot = RankingSnapshot(directory)
+        self._stop = threading.Event()
+
+    def file_signature(self):
+        signature = []
+        for file in list(RANKING_FILES.values()) + [MERGED_FILE]:
+            try:
+                stat = os.stat(os.path.join(self.directory, file))
+                signature.append((file, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append((file, None, None))
+        return signature
+
+    def reload(self, signature):
+        try:
+            snapshot = RankingSnapshot(self.directory, self.snapshot.version + 1)
+        except Exception as e:  # Keep serving the previous results
+            print(f"Reload failed, keeping version {self.snapshot.version}: {e}")
+            self.failed = signature
+            return False
+        self.snapshot, self.signature = snapshot, signature
+        print(f"Reloaded rankings, version {snapshot.version}")
+        return True
+
+    def watch(self):
+        pending = None
+        while not self._stop.wait(self.poll_seconds):
+            signature = self.file_signature()
+            if signature in (self.signature, self.failed):
+                pending = None
+            elif signature == pending:
+                self.reload(signature)
+            else:
+                pending = signature  # Still being written, check again next poll
+
+    def start_watching(self):
+        threading.Thread(target=self.watch, name="ranking-reload", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+def _page(rows, offset, limit, **meta):
+    """JSON body of one page of pre-encoded rows."""
+    meta.update(total=len(rows), offset=offset, limit=limit, next_offset=offset + limit if offset + limit < len(rows) else None)
+    return f'{json.dumps(meta)[:-1]},"items":[{",".join(rows[offset:offset + limit])}]}}'
+
+class RankingHandler(BaseHTTPRequestHandler):
+    """
+    GET /top?ranking=rank_author1&offset=0&limit=50
+    GET /author/<id>
+    GET /event/<id>?offset=0&limit=50
+    GET /health
+    """
+    protocol_version = "HTTP/1.1"  # Keep-alive, clients reuse their connection
+    disable_nagle_algorithm = True  # Headers and body go out as separate writes, don't wait for the ACK between them
+
+    def do_GET(self):
+        snapshot = self.server.store.snapshot  # Taken once, a reload swaps in a new object
+        version = snapshot.version
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            offset = max(0, int(query.get("offset", 0)))
+            limit = min(MAX_LIMIT, max(1, int(query.get("limit", DEFAULT_LIMIT))))
+            if parts == ["top"]:
+                ranking = query.get("ranking", "rank_author1")
+                if ranking not in snapshot.rankings:
+                    return self.send_json(404, {"error": f"ranking {ranking!r} not loaded, choose from {sorted(snapshot.rankings)}"})
+                return self.send_body(200, _page(snapshot.rankings[ranking], offset, limit, ranking=ranking, version=version))
+            if len(parts) == 2 and parts[0] == "author":
+                author_id = int(parts[1])
+                rankings = {name: rows.get(author_id, []) for name, rows in snapshot.author_rows.items()}
+                entries = snapshot.author_entries.get(author_id, [])
+                if not entries and not any(rankings.values()):
+                    return self.send_json(404, {"error": f"author {author_id} not found"})
+                ranked = ",".join(f'{json.dumps(name)}:[{",".join(rows)}]' for name, rows in rankings.items())
+                return self.send_body(200, f'{{"author":{author_id},"version":{version},"rankings":{{{ranked}}},"entries":[{",".join(entries)}]}}')
+            if len(parts) == 2 and parts[0] == "event":
+                event = int(parts[1])
+                if event not in snapshot.events:
+                    return self.send_json(404, {"error": f"event {event} not found", "events": sorted(snapshot.events)})
+                return self.send_body(200, _page(snapshot.events[event], offset, limit, event=event, version=version))
+            if parts == ["health"]:
+                return self.send_json(200, snapshot.health())
+        except ValueError:
+            return self.send_json(400, {"error": "ids, offset and limit must be integers"})
+        self.send_json(404, {"error": "unknown path, use /top, /author/<id>, /event/<id> or /health"})
+
+    def send_json(self, status, value):
+        self.send_body(status, json.dumps(value))
+
+    def send_body(self, status, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # One line per request costs more than the query itself
+
+def make_server(host="127.0.0.1", port=8000, directory=".", poll_seconds=POLL_SECONDS):
+    """Build the server with its store loaded; call serve_forever() to start it."""
+    server = ThreadingHTTPServer((host, port), RankingHandler)
+    server.daemon_threads = True
+    server.store = RankingStore(directory, poll_seconds)
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the author rankings from memory over HTTP/JSON, reloading when the pipeline rewrites them.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--directory", type=str, default=".", help="Directory of the ranking outputs and merged table")
+    parser.add_argument("--poll_seconds", type=float, default=POLL_SECONDS, help="How often to check the outputs for changes")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.directory, args.poll_seconds)
+    server.store.start_watching()
+    print(f"Serving {server.store.snapshot.health()['rankings']} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.store.stop()
+        server.server_close()
@@ -0,0 +1,287 @@
+import argparse
+import os
+import uuid
+import numpy as np
+import pandas as pd
+import author
+import rank_author1
+import schema
+import storage
+import instrument
+
+STATE_DIR = "author_rank_state"
+TOTALS_FILE = "totals.npz"
+
+sum_columns = ['entry_score', 'team_size'] + [f'{category}_score' for category in schema.CATEGORIES] + [f'{category}_rank' for category in schema.CATEGORIES]
+count_columns = sum_columns[1:]  # entry_score is never null, its count is the number of entries
+
+def event_contributions(rows):
+    """
+    Per-author sums and non-null counts of one event, everything the
+    rank_author1 aggregates need, from one grouped aggregation.
+
+    Args:
+        rows (DataFrame): One row per (author, game) of the event, as from author.flatten_authors
+
+    Returns:
+        dict: arrays 'authors' (ascending), 'entries', 'sums' (authors x sum_columns),
+        'counts' (authors x count_columns), and the distinct (author, game) and
+        (author, event) pairs as 'game_authors'/'game_links' and 'event_authors'/'event_ids'
+    """
+    aggregated = rank_author1.entry_scores(rows).groupby('author')[sum_columns].agg(['sum', 'count'])
+    games = rows[['author', 'game_link']].dropna().drop_duplicates()
+    events = rows[['author', 'ludum_dare_version']].dropna().drop_duplicates()
+    return {
+        'authors': aggregated.index.to_numpy(dtype=np.int64),
+        'entries': aggregated[('entry_score', 'count')].to_numpy(dtype=np.int64),
+        'sums': aggregated.xs('sum', axis=1, level=1)[sum_columns].to_numpy(dtype=np.float64),
+        'counts': aggregated.xs('count', axis=1, level=1)[count_columns].to_numpy(dtype=np.int64),
+        'game_authors': games['author'].to_numpy(dtype=np.int64),
+        'game_links': games['game_link'].to_numpy(dtype=str),
+        'event_authors': events['author'].to_numpy(dtype=np.int64),
+        'event_ids': events['ludum_dare_version'].astype('int64').to_numpy(),
+    }
+
+class AuthorRankState:
+    """
+    Persisted per-author totals of rank_author1, so an event can be added or
+    re-scraped without touching the rest of history.
+
+    Totals are arrays over the authors in ascending id order, saved as one
+    .npz next to a file per event with that event's contributions, which a
+    re-scrape takes back out. Negated overall scores are also kept sorted,
+    an order-statistics structure: applying an event moves its authors'
+    scores with one batched delete and insert, and a rank is one binary search.
+
+    Args:
+        path (str): State directory
+    """
+    def __init__(self, path=STATE_DIR):
+        self.path = path
+        self.authors = np.empty(0, dtype=np.int64)
+        self.entries = np.empty(0, dtype=np.int64)
+        self.sums = np.empty((0, len(sum_columns)))
+        self.counts = np.empty((0, len(count_columns)), dtype=np.int64)
+        self.sorted_scores = np.empty(0)  # -overall_score of every author, ascending
+        self.event_files = {}  # {event_key: contributions file in path}
+        self.pending = {}  # {event_key: contributions} applied since the last save
+
+    @classmethod
+    @instrument.timed("rank_state.load", rows=lambda state, *args, **kwargs: len(state.authors))
+    def load(cls, path=STATE_DIR):
+        """Read the saved totals (an empty state if there are none), no event is replayed."""
+        state = cls(path)
+        totals_file = os.path.join(path, TOTALS_FILE)
+        if os.path.exists(totals_file):
+            with np.load(totals_file) as totals:
+                state.authors, state.entries, state.sums, state.counts = (totals[name] for name in ('authors', 'entries', 'sums', 'counts'))
+                state.event_files = dict(zip(totals['event_keys'].tolist(), totals['event_files'].tolist()))
+            state.sorted_scores = np.sort(-state.scores())
+        return state
+
+    @instrument.timed("rank_state.save")
+    def save(self):
+        """
+        Write the contributions of each event applied since the last save to
+        a new file, then the totals, which commit them. Files the totals no
+        longer refer to are removed afterwards.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        event_files = dict(self.event_files)
+        for event_key, contributions in self.pending.items():
+            event_files[event_key] = f"{event_key}.{uuid.uuid4().hex[:12]}.npz"
+            np.savez_compressed(os.path.join(self.path, event_files[event_key]), **contributions)
+
+        keys = sorted(event_files)
+        tmp_path = os.path.join(self.path, f"{TOTALS_FILE}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, authors=self.authors, entries=self.entries, sums=self.sums, counts=self.counts,
+                     event_keys=np.array(keys, dtype=str), event_files=np.array([event_files[key] for key in keys], dtype=str))
+        os.replace(tmp_path, os.path.join(self.path, TOTALS_FILE))
+
+        for name in set(os.listdir(self.path)) - set(event_files.values()) - {TOTALS_FILE}:
+            if name.endswith(".npz"):
+                os.remove(os.path.join(self.path, name))
+        self.event_files = event_files
+        self.pending = {}
+
+    def scores(self, rows=slice(None)):
+        """Overall score of every author (or of the given rows), in self.authors order."""
+        return self.sums[rows, 0] / self.entries[rows]
+
+    def _contributions(self, event_key):
+        if event_key in self.pending:
+            return self.pending[event_key]
+        if event_key not in self.event_files:
+            return None
+        with np.load(os.path.join(self.path, self.event_files[event_key])) as data:
+            return {name: data[name] for name in data.files}
+
+    def _add(self, contributions, sign):
+        """Add (sign=1) or take out (sign=-1) one event's contributions, new authors get zero rows first."""
+        ids = contributions['authors']
+        new = np.setdiff1d(ids, self.authors, assume_unique=True)
+        if len(new):
+            at = np.searchsorted(self.authors, new)
+            self.authors = np.insert(self.authors, at, new)
+            self.entries = np.insert(self.entries, at, 0)
+            self.sums = np.insert(self.sums, at, 0.0, axis=0)
+            self.counts = np.insert(self.counts, at, 0, axis=0)
+        rows = np.searchsorted(self.authors, ids)
+        self.entries[rows] += sign * contributions['entries']
+        self.sums[rows] += sign * contributions['sums']
+        self.counts[rows] += sign * contributions['counts']
+
+    def _remove_scores(self, scores):
+        values = np.sort(-scores)
+        at = np.searchsorted(self.sorted_scores, values, side='left')
+        at += np.arange(len(values)) - np.searchsorted(values, values, side='left')  # Equal scores are adjacent
+        self.sorted_scores = np.delete(self.sorted_scores, at)
+
+    def _insert_scores(self, scores):
+        values = np.sort(-scores)
+        self.sorted_scores = np.insert(self.sorted_scores, np.searchsorted(self.sorted_scores, values), values)
+
+    def apply_contributions(self, event_key, contributions):
+        """Replace an event's contributions and re-rank only the authors it touches."""
+        previous = self._contributions(event_key)
+        affected = contributions['authors'] if previous is None else np.union1d(previous['authors'], contributions['authors'])
+
+        rows = np.searchsorted(self.authors, affected)
+        known = rows < len(self.authors)
+        known[known] = self.authors[rows[known]] == affected[known]
+        self._remove_scores(self.scores(rows[known]))
+
+        if previous is not None:
+            self._add(previous, -1)
+        self._add(contributions, 1)
+
+        rows = np.searchsorted(self.authors, affected)
+        gone = self.entries[rows] == 0  # Only in the previous version of the event
+        self._insert_scores(self.scores(rows[~gone]))
+        if gone.any():
+            self.authors, self.entries, self.sums, self.counts = (
+                np.delete(values, rows[gone], axis=0) for values in (self.authors, self.entries, self.sums, self.counts)
+            )
+        self.pending[event_key] = contributions
+        return affected
+
+    @instrument.timed("rank_state.apply", rows=lambda affected, self, event_key, rows: len(rows))
+    def apply_event(self, event_key, rows):
+        """
+        Apply one scraped event (new or re-scraped).
+
+        Args:
+            event_key (str): Stable event identifier, e.g. the event file name
+            rows (DataFrame): One row per (author, game), as from author.flatten_authors
+
+        Returns:
+            ndarray: Authors whose aggregates changed
+        """
+        return self.apply_contributions(event_key, event_contributions(rows))
+
+    def rank(self, author_id):
+        """'min' rank of an author by overall score, ties share the best rank."""
+        row = np.searchsorted(self.authors, author_id)
+        return int(np.searchsorted(self.sorted_scores, -self.scores(row), side='left')) + 1
+
+    def top(self, n):
+        """Ids of the n best-ranked authors, ties by author id."""
+        if not len(self.authors):
+            return self.authors
+        scores = self.scores()
+        candidates = np.flatnonzero(scores >= -self.sorted_scores[min(n, len(scores)) - 1])
+        return self.authors[candidates[np.lexsort((self.authors[candidates], -scores[candidates]))][:n]]
+
+    def _memberships(self, ids):
+        """Sets of game links and of events of each author in ids, from the per-event contributions."""
+        contributions = [self._contributions(event_key) for event_key in sorted(set(self.event_files) | set(self.pending))]
+        sets = []
+        for authors_key, values_key in (('game_authors', 'game_links'), ('event_authors', 'event_ids')):
+            authors = np.concatenate([c[authors_key] for c in contributions] or [np.empty(0, dtype=np.int64)])
+            values = np.concatenate([c[values_key] for c in contributions] or [np.empty(0)])
+            keep = np.isin(authors, ids)
+            grouped = pd.Series(values[keep].tolist(), index=authors[keep], dtype=object).groupby(level=0).agg(set)
+            sets.append([grouped.get(author_id, set()) for author_id in ids.tolist()])
+        return sets
+
+    def rankings(self, authors=None):
+        """
+        Rows in the format of rank_author1.calculate_author_rankings, sorted by rank.
+
+        Args:
+            authors (iterable): Only these authors (default: everyone)
+        """
+        rows = np.arange(len(self.authors)) if authors is None else np.searchsorted(self.authors, np.fromiter(authors, dtype=np.int64))
+        scores = self.scores(rows)
+        order = np.lexsort((self.authors[rows], -scores))
+        rows, scores = rows[order], scores[order]
+        ids = self.authors[rows]
+        counts = self.counts[rows]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = self.sums[rows, 1:] / counts  # NaN where a category has no grade
+        games, events = self._memberships(ids)
+
+        df = pd.DataFrame({
+            'author': ids,
+            'overall_score': scores,
+            'total_entries': self.entries[rows],
+            'average_team_size': np.where(counts[:, 0] > 0, means[:, 0], 0),
+            'unique_events': [len(values) for values in events],
+            'unique_games': [len(values) for values in games],
+        })
+        for j, col in enumerate(count_columns[1:], start=1):
+            df[col] = means[:, j]
+        df['game_link'] = games
+        df['ludum_events'] = events
+        df['rank'] = np.searchsorted(self.sorted_scores, -scores, side='left') + 1
+        return df
+
+@instrument.timed("rank_state.verify")
+def verify(state, files):
+    """
+    Recompute rank_author1 from scratch over files and compare it with the state.
+
+    Sums are accumulated per event, so scores can differ from the full
+    recompute in the last bits; ranks are compared on scores rounded to
+    9 decimals so such float-noise ties do not count as mismatches.
+
+    Returns:
+        bool: True when every author's scores, ranks, games and events match
+    """
+    scratch = rank_author1.aggregate_author_rankings(author.merge_authors(files)).set_index('author').sort_index()
+    incremental = state.rankings().set_index('author').sort_index()
+    numeric = [col for col in scratch.columns if col not in ('game_link', 'ludum_events', 'rank')]
+
+    matches = scratch.index.equals(incremental.index)
+    if matches:
+        rounded_ranks = [df['overall_score'].round(9).rank(ascending=False, method='min') for df in (scratch, incremental)]
+        matches = (
+            np.allclose(scratch[numeric].to_numpy(dtype=np.float64), incremental[numeric].to_numpy(dtype=np.float64), equal_nan=True)
+            and rounded_ranks[0].equals(rounded_ranks[1])
+            and (scratch['game_link'] == incremental['game_link']).all()
+            and (scratch['ludum_events'] == incremental['ludum_events']).all()
+        )
+    print(f"{len(scratch)} authors from scratch, {len(incremental)} in state: {'match' if matches else 'MISMATCH'}")
+    return matches
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental author rankings, updated one event at a time.")
+    parser.add_argument("command", choices=["apply", "rebuild", "verify", "top"], help="apply event files, rebuild from every event, verify against a full recompute, or show the top authors")
+    parser.add_argument("files", nargs="*", help="Event files for apply (default for rebuild/verify: every scraped event)")
+    parser.add_argument("--state_dir", type=str, default=STATE_DIR, help="Persisted totals and per-event contributions")
+    parser.add_argument("--top", type=int, default=10, help="Number of authors to show")
+    args = parser.parse_args()
+
+    files = args.files or storage.game_files()
+    state = AuthorRankState(args.state_dir) if args.command == "rebuild" else AuthorRankState.load(args.state_dir)
+
+    if args.command in ("apply", "rebuild"):
+        for file in files:
+            affected = state.apply_event(os.path.basename(file), author.flatten_authors(file))
+            print(f"{file}: {len(affected)} authors updated")
+        state.save()
+    elif args.command == "verify":
+        verify(state, files)
+
+    print(state.rankings(state.top(args.top)))
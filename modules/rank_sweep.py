@@ -0,0 +1,174 @@
+import argparse
+import json
+import numpy as np
+import pandas as pd
+import rank_author
+import schema
+import storage
+import instrument
+
+def default_config():
+    """The weighting used by rank_author.calculate_author_rank."""
+    return {
+        'category_weights': dict(schema.CATEGORY_WEIGHTS),
+        'tier_thresholds': rank_author.tier_thresholds.tolist(),
+        'tier_multipliers': rank_author.tier_multipliers.tolist(),
+        'component_weights': dict(rank_author.component_weights),
+    }
+
+def _config_arrays(configs):
+    """
+    Stack K configurations into arrays, missing keys fall back to default_config().
+
+    Returns:
+        ndarray: (K x 8) category weights in category_mapping order, normalised to sum 1
+        ndarray: (K x 3) participation/community/performance weights
+        ndarray: (U,) union of every tier threshold
+        ndarray: (K x U+1) multiplier of each union bin under each config
+    """
+    configs = [{**default_config(), **config} for config in configs]
+    categories = schema.CATEGORIES
+
+    weights = np.array([[config['category_weights'].get(category, 0) for category in categories] for config in configs], dtype=np.float64)
+    weights /= weights.sum(axis=1, keepdims=True)
+    components = np.array([
+        [config['component_weights'][part] for part in ('participation', 'community', 'performance')]
+        for config in configs
+    ], dtype=np.float64)
+
+    union = np.unique(np.concatenate([np.asarray(config['tier_thresholds'], dtype=np.float64) for config in configs]))
+    bin_edges = np.append(union, np.inf)  # Upper rank bound of every union bin, last bin is worse or unranked
+    multipliers = np.array([
+        np.asarray(config['tier_multipliers'], dtype=np.float64)[
+            np.searchsorted(np.asarray(config['tier_thresholds'], dtype=np.float64), bin_edges, side='left')
+        ]
+        for config in configs
+    ])
+    return weights, components, union, multipliers
+
+def rank_columns(scores):
+    """Descending 'min' rank of every column of an (n x K) score matrix, ties share the best rank."""
+    order = np.argsort(-scores, axis=0, kind='stable')
+    sorted_scores = np.take_along_axis(scores, order, axis=0)
+    positions = np.arange(len(scores))[:, None]
+    is_new = np.ones_like(sorted_scores, dtype=bool)
+    is_new[1:] = sorted_scores[1:] != sorted_scores[:-1]
+    sorted_ranks = np.maximum.accumulate(np.where(is_new, positions, 0), axis=0) + 1
+
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, sorted_ranks, axis=0)
+    return ranks
+
+def _count_inversions(values):
+    """Pairs i < j with values[i] > values[j], counted level by level of a bottom-up merge sort."""
+    _, values = np.unique(values, return_inverse=True)
+    values = values.astype(np.int64)
+    span = int(values.max()) + 1 if len(values) else 1
+    positions = np.arange(len(values))
+    inversions = 0
+    width = 1
+    while width < len(values):
+        block = positions // (2 * width)
+        in_right = positions % (2 * width) >= width
+        keys = block * span + values  # Each half is sorted, so keys of left halves are globally sorted
+        left_keys = keys[~in_right]
+        right_keys = keys[in_right]
+        # Left elements of the same block greater than each right element
+        block_end = np.searchsorted(left_keys, (block[in_right] + 1) * span, side='left')
+        inversions += int((block_end - np.searchsorted(left_keys, right_keys, side='right')).sum())
+        values = np.sort(keys) % span  # Merge: each block of 2 * width is now sorted
+        width *= 2
+    return inversions
+
+def _tied_pairs(*sorted_columns):
+    """Pairs tied on every column, for columns already sorted so ties are adjacent."""
+    n = len(sorted_columns[0])
+    if n < 2:
+        return 0
+    changes = np.zeros(n - 1, dtype=bool)
+    for column in sorted_columns:
+        changes |= column[1:] != column[:-1]
+    run_lengths = np.diff(np.concatenate(([0], np.flatnonzero(changes) + 1, [n])))
+    return int((run_lengths * (run_lengths - 1) // 2).sum())
+
+def kendall_tau(x, y):
+    """Kendall tau-b between two score vectors, O(n log n)."""
+    n = len(x)
+    order = np.lexsort((y, x))
+    x_sorted, y_by_x = x[order], y[order]
+    discordant = _count_inversions(y_by_x)
+    total = n * (n - 1) // 2
+    ties_x, ties_y, ties_xy = _tied_pairs(x_sorted), _tied_pairs(np.sort(y)), _tied_pairs(x_sorted, y_by_x)
+    concordant = total - ties_x - ties_y + ties_xy - discordant
+    denominator = np.sqrt(float(total - ties_x) * float(total - ties_y))
+    return (concordant - discordant) / denominator if denominator else np.nan
+
+def kendall_tau_matrix(scores):
+    """(K x K) Kendall tau-b between the columns of an (n x K) score matrix."""
+    k = scores.shape[1]
+    tau = np.eye(k)
+    for a in range(k):
+        for b in range(a + 1, k):
+            tau[a, b] = tau[b, a] = kendall_tau(scores[:, a], scores[:, b])
+    return tau
+
+@instrument.timed("sweep", rows=lambda result, df, *args, **kwargs: len(df))
+def sweep_author_scores(df, configs, with_tau=True):
+    """
+    Score every row of the merged author table under K weight/tier
+    configurations at once.
+
+    Args:
+        df (DataFrame): Merged author table, as for calculate_author_rank
+        configs (list): Dicts with any of 'category_weights', 'tier_thresholds',
+            'tier_multipliers', 'component_weights' (missing keys use default_config())
+        with_tau (bool): Compute the K x K Kendall tau matrix (O(K^2 n log n))
+
+    Returns:
+        dict: 'author' (n,), 'scores' (n x K composite scores), 'ranks' (n x K),
+        'kendall_tau' (K x K rank stability between configs, None without with_tau)
+    """
+    ranked_df = rank_author.convert_numeric(df)
+    participation_score, community_score = rank_author.component_scores(ranked_df)
+    ranks, averages = rank_author.position_matrices(ranked_df)
+    weights, components, union, multipliers = _config_arrays(configs)
+
+    # Performance of every config: one (n x 8) @ (8 x K) product per union tier bin
+    base = np.nan_to_num(averages, nan=0.0) / 5
+    bins = np.searchsorted(union, ranks, side='left')
+    performance = np.zeros((len(ranked_df), len(weights)))
+    for b in range(len(union) + 1):
+        performance += (np.where(bins == b, base, 0.0) @ weights.T) * multipliers[:, b]
+
+    scores = (
+        np.outer(participation_score, components[:, 0]) +
+        np.outer(community_score, components[:, 1]) +
+        performance * components[:, 2]
+    ) * 100
+
+    return {
+        'author': ranked_df['author'].to_numpy(),
+        'scores': scores,
+        'ranks': rank_columns(scores),
+        'kendall_tau': kendall_tau_matrix(scores) if with_tau else None,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score authors under many weight configurations in one pass.")
+    parser.add_argument("configs", type=str, help="JSON file with a list of configurations")
+    parser.add_argument("--input_file", type=str, default="merged_authors_with_files.csv", help="Merged author table, .csv, .parquet or .arrow")
+    parser.add_argument("--output_file", type=str, default="rank_sweep.csv", help="Author x config composite scores")
+    args = parser.parse_args()
+
+    with open(args.configs) as f:
+        configs = json.load(f)
+
+    result = sweep_author_scores(storage.read_table(args.input_file, columns=rank_author.input_columns), configs)
+
+    scores = pd.DataFrame(result['scores'], columns=[f'config_{k}_score' for k in range(len(configs))])
+    scores.insert(0, 'author', result['author'])
+    scores.to_csv(args.output_file, index=False)
+
+    print("Kendall tau between configs:")
+    print(pd.DataFrame(result['kendall_tau']).round(3))
+    print(f"\nScores saved to {args.output_file}")
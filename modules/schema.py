@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+# Category of each grade prefix, in column order of every grade matrix
+CATEGORY_MAPPING = {
+    'grade-01': 'Overall',
+    'grade-02': 'Fun',
+    'grade-03': 'Innovation',
+    'grade-04': 'Theme',
+    'grade-05': 'Graphics',
+    'grade-06': 'Audio',
+    'grade-07': 'Humor',
+    'grade-08': 'Mood'
+}
+CATEGORIES = list(CATEGORY_MAPPING.values())
+
+AVERAGE_COLUMNS = [f'{prefix}-average' for prefix in CATEGORY_MAPPING]
+RESULT_COLUMNS = [f'{prefix}-result' for prefix in CATEGORY_MAPPING]
+GRADE_COLUMNS = [f'{prefix}-{kind}' for prefix in CATEGORY_MAPPING for kind in ('average', 'result')]  # As in the event files
+ENGAGEMENT_COLUMNS = ['cool', 'feedback', 'given', 'grade', 'smart']
+
+AVERAGE_DECIMALS = 3  # ldjam publishes grade averages with 3 decimals
+
+# Engagement and grade columns, in event file order
+SCORE_COLUMNS = ['cool', 'feedback', 'given', 'grade'] + GRADE_COLUMNS + ['smart']
+
+# Weight of each category in both rankings, also the legend order of rank_author
+CATEGORY_WEIGHTS = {
+    'Fun': 0.35,      # Highest priority
+    'Overall': 0.30,   # Second priority
+    'Mood': 0.12,     # Third priority
+    'Graphics': 0.10,  # Fourth priority
+    'Innovation': 0.05,
+    'Audio': 0.04,
+    'Theme': 0.03,
+    'Humor': 0.01
+}
+
+# Fixed columns of a scraped event file, in file order; SCORE_COLUMNS and other magic columns follow
+GAME_COLUMNS = [
+    'id', 'name', 'author', 'team_size', 'slug', 'published', 'created', 'modified', 'comments',
+    'game_position', 'ludum_dare_version', 'data_authors', 'game_link', 'links_body'
+]
+
+# Per-game columns carried into the merged author table
+ENTRY_COLUMNS = ['game_position', 'team_size', 'ludum_dare_version', 'game_link', 'id'] + SCORE_COLUMNS
+
+# Canonical in-memory dtypes. Ids and file rows fit int32; counts and grade
+# results that can be missing in a scrape use the nullable Int32; grade
+# averages (3 decimals) are exact in float32; events, files and links repeat
+# for every author of a game, so they are categorical. Engagement scores keep
+# float64, they carry more digits than float32 holds.
+DTYPES = {
+    'id': 'int32',
+    'author': 'int32',
+    'row': 'int32',
+    'count': 'int32',
+    'team_size': 'Int32',
+    'comments': 'Int32',
+    'game_position': 'Int32',
+    'feedback': 'Int32',
+    'ludum_dare_version': 'category',
+    'file_name': 'category',
+    'game_link': 'category',
+    'cool': 'float64',
+    'given': 'float64',
+    'grade': 'float64',
+    'smart': 'float64',
+    **{col: 'float32' for col in AVERAGE_COLUMNS},
+    **{col: 'Int32' for col in RESULT_COLUMNS},
+}
+
+# Columns holding one list per game in the event files (author ids, links)
+LIST_COLUMNS = ['author', 'links_body']
+
+# Numeric type of categorical columns whose categories are numbers
+CATEGORY_VALUES = {'ludum_dare_version': 'Int32'}
+
+# Types the CSV parser reads fastest, apply() then casts to DTYPES
+PARSE_TYPES = {'Int32': 'float64', 'category': 'str'}
+
+def csv_dtypes(columns=None):
+    """dtype argument for read_csv, so no column type is inferred; list columns are read as text."""
+    return {
+        col: 'float64' if col in CATEGORY_VALUES else PARSE_TYPES.get(dtype, dtype) for col, dtype in DTYPES.items()
+        if col not in LIST_COLUMNS and (columns is None or col in columns)
+    }
+
+def grade_matrix(df, columns):
+    """
+    Dense float64 (rows x columns) array of grade columns, NaN where missing.
+    float32 averages are widened back to their published decimals, so
+    scores match the ones computed from the CSV text; Int32 results are
+    whole numbers already.
+    """
+    grades = df.reindex(columns=columns)
+    values = grades.to_numpy(dtype=np.float64, na_value=np.nan)
+    if all(pd.api.types.is_integer_dtype(dtype) for dtype in grades.dtypes):
+        return values
+    return np.round(values, AVERAGE_DECIMALS)
+
+def apply(df):
+    """
+    Cast the known columns of df to their canonical dtypes, in place.
+
+    List columns are left alone unless they already hold scalar numbers
+    (e.g. `author` once exploded). Returns df.
+    """
+    for col, dtype in DTYPES.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if col in LIST_COLUMNS and not pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        values = df[col]
+        if col in CATEGORY_VALUES and pd.api.types.is_numeric_dtype(values):
+            values = values.astype(CATEGORY_VALUES[col])
+        df[col] = values.astype(dtype)
+    return df
@@ -0,0 +1,59 @@
+import json
+import os
+
+class ScrapeManifest:
+    """
+    Per-event record of scraped games keyed on their node `modified` value.
+
+    Stored as JSON lines that are appended after every detail chunk, so an
+    interrupted run loses at most one chunk and resumes from the checkpoint.
+    Later lines win when the log is replayed.
+
+    Args:
+        path (str): Manifest file, usually `{output_file}_{event_id}.manifest.jsonl`
+    """
+    def __init__(self, path):
+        self.path = path
+        self.games = {}  # {game_id: {"modified": str, "row": dict}}
+
+    @classmethod
+    def load(cls, path):
+        manifest = cls(path)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line from a crash mid-write
+                    manifest.games[entry["id"]] = {"modified": entry["modified"], "row": entry["row"]}
+        return manifest
+
+    def is_current(self, game_id, modified):
+        """True if the game was scraped at this `modified` value and needs no re-fetch."""
+        entry = self.games.get(game_id)
+        return modified is not None and entry is not None and entry["modified"] == modified
+
+    def checkpoint(self, rows):
+        """Record processed rows and append them to the log on disk."""
+        with open(self.path, "a", encoding="utf-8") as file:
+            for row in rows:
+                self.games[row["id"]] = {"modified": row["modified"], "row": row}
+                file.write(json.dumps({"id": row["id"], "modified": row["modified"], "row": row}) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def rows(self, game_ids):
+        """Stored rows for game_ids, in that order."""
+        return [self.games[game_id]["row"] for game_id in game_ids if game_id in self.games]
+
+    def compact(self, game_ids):
+        """Rewrite the log with one line per game still in the event."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            for game_id in game_ids:
+                if game_id in self.games:
+                    entry = self.games[game_id]
+                    file.write(json.dumps({"id": game_id, **entry}) + "\n")
+        os.replace(tmp_path, self.path)
+        self.games = {game_id: self.games[game_id] for game_id in game_ids if game_id in self.games}
@@ -0,0 +1,269 @@
+import ast
+import csv
+import glob
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import schema
+from schema import LIST_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # CSV keeps working without pyarrow
+    pa = None
+
+FORMATS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}  # LIST_COLUMNS are stored as "[...]" text in CSV
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet/Arrow output needs pyarrow: pip install pyarrow")
+
+def _arrow_type(col, default):
+    """Arrow type of a column from schema.DTYPES; categories store their values, list columns their elements."""
+    dtype = schema.CATEGORY_VALUES.get(col, schema.DTYPES.get(col))
+    if dtype is None:
+        arrow_type = default
+    elif dtype == "category":
+        arrow_type = pa.string()
+    else:
+        arrow_type = pa.from_numpy_dtype(pd.api.types.pandas_dtype(dtype.lower()))  # Int32 -> int32, nulls allowed
+    return pa.list_(arrow_type) if col in LIST_COLUMNS else arrow_type
+
+def game_schema(magic_keys):
+    """Typed schema for a scraped event from schema.DTYPES, unknown magic columns are float64."""
+    _require_pyarrow()
+    fields = [(col, _arrow_type(col, pa.string())) for col in schema.GAME_COLUMNS]
+    fields += [(key, _arrow_type(key, pa.float64())) for key in magic_keys]
+    return pa.schema(fields)
+
+def save_games(filename, game_data, magic_keys):
+    """Write processed game rows to Parquet or Arrow IPC, chosen by the file extension."""
+    table_schema = game_schema(magic_keys)
+    columns = {
+        name: [None if row.get(name, "") == "" else row[name] for row in game_data]
+        for name in table_schema.names
+    }
+    write_table(pa.Table.from_pydict(columns, schema=table_schema), filename)
+
+def csv_frame(df):
+    """
+    df with the Int32 columns that have gaps as float64, so CSV output reads
+    "55.0" there as it did before the schema dtypes, and "55" elsewhere.
+    """
+    return df.astype({col: "float64" for col in df.columns if df[col].dtype == "Int32" and df[col].hasnans})
+
+def write_table(table, filename):
+    """Write a pyarrow Table or pandas DataFrame to .parquet, .arrow or .csv."""
+    if filename.endswith(".csv"):
+        df = table if isinstance(table, pd.DataFrame) else table.to_pandas()
+        csv_frame(df).to_csv(filename, index=False)
+        return
+    _require_pyarrow()
+    if isinstance(table, pd.DataFrame):
+        table = pa.Table.from_pandas(table, preserve_index=False)
+    if filename.endswith(".arrow"):
+        feather.write_feather(table, filename)
+    else:
+        pq.write_table(table, filename)
+
+def _parse_list(value):
+    if not isinstance(value, str):
+        return []
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return []
+    return [parsed] if isinstance(parsed, int) else list(parsed)
+
+def _read_arrow(filename, columns):
+    if filename.endswith(".arrow"):
+        names = pa.ipc.open_file(pa.memory_map(filename)).schema.names
+        return feather.read_table(filename, columns=[col for col in columns if col in names], memory_map=True)
+    names = pq.read_schema(filename).names
+    return pq.read_table(filename, columns=[col for col in columns if col in names])
+
+def _read_csv(source, columns):
+    usecols = (lambda col: col in columns) if columns else None
+    df = pd.read_csv(source, usecols=usecols, dtype=schema.csv_dtypes(columns))
+    for col in LIST_COLUMNS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].map(_parse_list)
+    return schema.apply(df)
+
+def read_table(filename, columns=None):
+    """
+    Read a stage output (scraped event or merged table) into a DataFrame.
+
+    Args:
+        filename (str): .csv, .parquet or .arrow file
+        columns (list): Only load these columns (missing ones are skipped)
+
+    Returns:
+        DataFrame: schema dtypes; `author`/`links_body` hold lists when they are per-game lists
+    """
+    if filename.endswith(".csv"):
+        return _read_csv(filename, columns)
+
+    _require_pyarrow()
+    if not columns:
+        table = feather.read_table(filename) if filename.endswith(".arrow") else pq.read_table(filename)
+    else:
+        table = _read_arrow(filename, columns)
+    return schema.apply(table.to_pandas())
+
+def read_exploded(filename, columns, list_column="author"):
+    """
+    Read an event file with one row per element of list_column (one row per
+    author of each game), without a Python object per row.
+
+    Args:
+        filename (str): .csv, .parquet or .arrow file
+        columns (list): Columns to load, must include list_column
+
+    Returns:
+        DataFrame: schema dtypes, list_column holds ids, rows with empty or zero ids are dropped;
+        indexed by the row of each element's game in the file
+    """
+    if filename.endswith(".csv"):
+        df = pd.read_csv(filename, usecols=lambda col: col in columns, dtype={**schema.csv_dtypes(columns), list_column: "string"})
+        df[list_column] = df[list_column].str.strip("[]").str.split(",")
+        df = df.explode(list_column)
+        df[list_column] = pd.to_numeric(df[list_column].str.strip(), errors="coerce")
+    else:
+        _require_pyarrow()
+        table = _read_arrow(filename, columns)
+        ids = table[list_column]
+        rest = table.drop_columns([list_column])
+        parents = pc.list_parent_indices(ids)
+        if rest.num_columns:
+            df = rest.take(parents).append_column(list_column, pc.list_flatten(ids)).to_pandas()
+            df = df[[col for col in table.schema.names]]
+        else:  # Nothing to repeat per element, a zero-column take would also lose the row count
+            df = pd.DataFrame({list_column: pc.list_flatten(ids).to_numpy(zero_copy_only=False)})
+        df.index = parents.to_numpy()
+
+    df = df[df[list_column].notna() & (df[list_column] != 0)]
+    df[list_column] = df[list_column].astype(schema.DTYPES.get(list_column, "int64"))
+    return schema.apply(df)
+
+def csv_offsets(filename):
+    """
+    Byte offset of every record of a CSV file, found once so single rows can
+    be read with a seek. Quoted fields may span lines.
+
+    Returns:
+        ndarray: int64 start of each row after the header, then the end of the file
+    """
+    line_starts = []
+
+    def lines(f):
+        position = 0
+        for line in f:
+            line_starts.append(position)
+            position += len(line)
+            yield line.decode("utf-8")
+        line_starts.append(position)
+
+    offsets = []
+    with open(filename, "rb") as f:
+        reader = csv.reader(lines(f))
+        next(reader, None)  # Header
+        parsed = len(line_starts)
+        for record in reader:
+            if record:  # read_csv skips blank lines too
+                offsets.append(line_starts[parsed])
+            parsed = len(line_starts)
+    offsets.append(line_starts[-1])
+    return np.array(offsets, dtype=np.int64)
+
+def _read_typed_rows(filename, rows, columns):
+    _require_pyarrow()
+    if filename.endswith(".arrow"):
+        table = feather.read_table(filename, memory_map=True) if columns is None else _read_arrow(filename, columns)
+        return table.take(rows).to_pandas()
+
+    parquet = pq.ParquetFile(filename)
+    if columns is not None:
+        columns = [col for col in columns if col in parquet.schema_arrow.names]
+    starts = np.cumsum([0] + [parquet.metadata.row_group(i).num_rows for i in range(parquet.num_row_groups)])
+    groups = np.searchsorted(starts, rows, side="right") - 1
+    order = np.argsort(groups, kind="stable")
+    pieces = [
+        parquet.read_row_group(group, columns=columns).take(rows[order][groups[order] == group] - starts[group])
+        for group in np.unique(groups)
+    ]
+    return pa.concat_tables(pieces).take(np.argsort(order)).to_pandas()
+
+def read_rows(selection, columns=None, offsets=None):
+    """
+    Read some rows of event files without loading the rest: Parquet reads
+    only the row groups holding them, Arrow only the requested columns of the
+    memory-mapped file, CSV seeks to each record. CSV records of files with
+    the same header are parsed together.
+
+    Args:
+        selection (dict): {file: row numbers} (.csv, .parquet or .arrow), in the order wanted
+        columns (list): Only load these columns (missing ones are skipped)
+        offsets (dict): {CSV file: csv_offsets}, found here for CSV files not in it
+
+    Returns:
+        DataFrame: schema dtypes, the rows of every file in selection order
+    """
+    frames = {}
+    csv_records = {}  # Header -> [(file, records)]
+    for file, rows in selection.items():
+        rows = np.asarray(rows, dtype=np.int64)
+        if not file.endswith(".csv"):
+            frames[file] = _read_typed_rows(file, rows, columns)
+            continue
+        file_offsets = offsets[file] if offsets and file in offsets else csv_offsets(file)
+        with open(file, "rb") as f:
+            header = f.readline()
+            records = []
+            for row in rows:
+                f.seek(file_offsets[row])
+                record = f.read(file_offsets[row + 1] - file_offsets[row])
+                records.append(record if record.endswith(b"\n") else record + b"\n")
+        csv_records.setdefault(header, []).append((file, records))
+
+    for header, pieces in csv_records.items():
+        df = _read_csv(io.BytesIO(header + b"".join(b"".join(records) for _, records in pieces)), columns)
+        start = 0
+        for file, records in pieces:
+            frames[file] = df.iloc[start:start + len(records)]
+            start += len(records)
+    return schema.apply(pd.concat([frames[file] for file in selection], ignore_index=True))
+
+def game_files(prefix="ludum_dare_games"):
+    """One file per scraped event, preferring Parquet, then Arrow, over CSV when several exist."""
+    by_event = {}
+    for extension in (".parquet", ".arrow", ".csv"):
+        for file in glob.glob(f"{prefix}_*{extension}"):
+            match = re.search(rf"_([^_]+){re.escape(extension)}$", file)
+            if match:
+                by_event.setdefault(match.group(1), file)
+    return sorted(by_event.values())
+
+def map_files(func, files, workers=1):
+    """
+    Apply func to every file, in a process pool when workers > 1.
+
+    Args:
+        func (callable): Module-level function taking one file path
+        files (list): Input files
+        workers (int): Worker processes, None uses every core
+
+    Returns:
+        list: Results in the order of files, whatever the worker count
+    """
+    workers = workers or os.cpu_count()
+    if workers > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(files))) as pool:
+            return list(pool.map(func, files))
+    return [func(file) for file in files]
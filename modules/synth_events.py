@@ -0,0 +1,173 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import schema
+import storage
+
+# Share of games by team size, close to the scraped top 200 of an event
+TEAM_SIZES = {1: 0.30, 2: 0.24, 3: 0.20, 4: 0.12, 5: 0.05, 6: 0.04, 7: 0.025, 8: 0.015, 10: 0.01}
+
+# Chance that a rated game opted out of a category (Audio and Humor most often)
+CATEGORY_OPT_OUT = {'Overall': 0.0, 'Fun': 0.0, 'Innovation': 0.0, 'Theme': 0.0, 'Graphics': 0.02, 'Audio': 0.26, 'Humor': 0.21, 'Mood': 0.04}
+
+FIRST_EVENT = 38  # First event with the current ldjam.com API
+AUTHOR_SKEW = 1.1  # Zipf exponent of author popularity, a few authors enter most events
+
+def parse_team_sizes(text):
+    """'1:0.3,2:0.25,4:0.1' -> {1: 0.3, 2: 0.25, 4: 0.1}"""
+    sizes = {}
+    for item in text.split(","):
+        size, share = item.split(":")
+        sizes[int(size)] = float(share)
+    return sizes
+
+def _draw_authors(rng, team_sizes, n_authors):
+    """
+    Author ids of every team member, popular authors drawn more often.
+
+    Returns:
+        ndarray: Author id of every member slot, teams back to back
+    """
+    weights = 1.0 / np.arange(1, n_authors + 1) ** AUTHOR_SKEW
+    slots = rng.choice(n_authors, size=int(team_sizes.sum()), p=weights / weights.sum())
+    # Nobody is twice on the same team: redraw repeats uniformly
+    teams = np.repeat(np.arange(len(team_sizes)), team_sizes)
+    order = np.lexsort((slots, teams))
+    repeated = np.zeros(len(slots), dtype=bool)
+    repeated[order[1:]] = (teams[order[1:]] == teams[order[:-1]]) & (slots[order[1:]] == slots[order[:-1]])
+    slots[repeated] = rng.integers(0, n_authors, size=repeated.sum())
+    return slots + 1000  # Real ids are never small
+
+def _event_grades(rng, n_games, missing_grades):
+    """
+    Category averages and results of one event.
+
+    Returns:
+        ndarray: (games x categories) averages, 3 decimals, NaN where not rated
+        ndarray: (games x categories) results, 'min' rank of the average within the event
+    """
+    quality = rng.normal(3.4, 0.45, size=(n_games, 1))  # Good games are good in every category
+    averages = np.clip(quality + rng.normal(0, 0.3, size=(n_games, len(schema.CATEGORIES))), 1, 5).round(schema.AVERAGE_DECIMALS)
+    opt_out = np.array([CATEGORY_OPT_OUT[category] for category in schema.CATEGORIES])
+    averages[rng.random(averages.shape) < opt_out] = np.nan
+    averages[rng.random(n_games) < missing_grades] = np.nan  # Not enough ratings to be graded
+
+    results = pd.DataFrame(averages).rank(ascending=False, method='min').to_numpy()
+    return averages, results
+
+def generate_event(rng, event_id, n_games, first_game_id, n_authors, team_sizes=TEAM_SIZES, missing_grades=0.05):
+    """
+    One synthetic event in the scraped event file layout.
+
+    Args:
+        rng (Generator): Random source
+        event_id (int): ludum_dare_version of the event
+        n_games (int): Games in the event
+        first_game_id (int): Game ids are first_game_id, first_game_id + 1, ...
+        n_authors (int): Size of the author pool shared by all events
+        team_sizes (dict): {team size: share of games}
+        missing_grades (float): Share of games without any grade
+
+    Returns:
+        DataFrame: schema.GAME_COLUMNS + schema.SCORE_COLUMNS, author and links_body hold lists,
+        rows in game_position order like save_to_csv writes them
+    """
+    sizes = np.array(list(team_sizes))
+    shares = np.array(list(team_sizes.values()), dtype=np.float64)
+    team_size = rng.choice(sizes, size=n_games, p=shares / shares.sum())
+    members = _draw_authors(rng, team_size, n_authors).tolist()
+    bounds = np.concatenate(([0], np.cumsum(team_size))).tolist()
+    authors = [members[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+    averages, results = _event_grades(rng, n_games, missing_grades)
+    # Positions follow the Overall result, ungraded games come last
+    position = np.argsort(np.nan_to_num(results[:, 0], nan=n_games + 1), kind='stable')
+    game_position = np.empty(n_games, dtype=np.int64)
+    game_position[position] = np.arange(1, n_games + 1)
+
+    ids = np.arange(first_game_id, first_game_id + n_games)
+    slugs = [f"game-{game_id}" for game_id in ids.tolist()]
+    day = f"{2017 + (event_id - FIRST_EVENT) // 2:04d}-{10 if event_id % 2 else 4:02d}"
+    given = rng.gamma(2.5, 16, size=n_games).round(3)
+    games = {
+        'id': ids,
+        'name': [f"Game {game_id}" for game_id in ids.tolist()],
+        'author': authors,
+        'team_size': team_size,
+        'slug': slugs,
+        'published': f"{day}-04T12:00:00Z",
+        'created': f"{day}-01T12:00:00Z",
+        'modified': f"{day}-20T12:00:00Z",
+        'comments': rng.poisson(40, size=n_games) + 5,
+        'game_position': game_position,
+        'ludum_dare_version': event_id,
+        'data_authors': [f"https://api.ldjam.com/vx/node2/get/{'+'.join(map(str, team))}" for team in authors],
+        'game_link': [f"/events/ludum-dare/{event_id}/{slug}" for slug in slugs],
+        'links_body': [[] for _ in range(n_games)],
+        'cool': rng.normal(95, 25, size=n_games).round(9),
+        'feedback': rng.poisson(50, size=n_games),
+        'given': given,
+        'grade': (given + rng.gamma(2, 8, size=n_games)).round(3),
+    }
+    for column, (index, kind) in zip(schema.GRADE_COLUMNS, np.ndindex(len(schema.CATEGORIES), 2)):
+        games[column] = averages[:, index] if kind == 0 else pd.array(results[:, index], dtype='Int64')
+    games['smart'] = rng.normal(-10, 18, size=n_games).round(9)
+
+    return pd.DataFrame(games).sort_values('game_position', ignore_index=True)[schema.GAME_COLUMNS + schema.SCORE_COLUMNS]
+
+def write_event(df, filename):
+    """Write a generated event like the scraper does: lists as "[...]" text in CSV, typed lists otherwise."""
+    if filename.endswith(".csv"):
+        df = df.assign(**{col: df[col].map(str) for col in schema.LIST_COLUMNS})
+        storage.write_table(df, filename)
+        return
+    storage._require_pyarrow()
+    table = storage.pa.Table.from_pandas(df, schema=storage.game_schema(schema.SCORE_COLUMNS), preserve_index=False)
+    storage.write_table(table, filename)
+
+def generate_events(output_dir, n_events=10, games_per_event=1000, seed=0, team_sizes=TEAM_SIZES, missing_grades=0.05,
+                    authors_per_game=0.8, fmt="csv", prefix="ludum_dare_games"):
+    """
+    Write a seeded set of synthetic event files; the same arguments always give identical files.
+
+    Args:
+        output_dir (str): Directory for the event files
+        n_events (int): Number of events
+        games_per_event (int): Games in each event
+        seed (int): RNG seed
+        team_sizes (dict): {team size: share of games}
+        missing_grades (float): Share of games without any grade
+        authors_per_game (float): Size of the author pool per game, lower means more returning authors
+        fmt (str): "csv", "parquet" or "arrow"
+
+    Returns:
+        list: Written files, in event order
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    n_authors = max(1, int(n_events * games_per_event * authors_per_game))
+    files = []
+    for offset, child in enumerate(np.random.SeedSequence(seed).spawn(n_events)):
+        event_id = FIRST_EVENT + offset
+        df = generate_event(np.random.default_rng(child), event_id, games_per_event, 100000 + offset * games_per_event,
+                            n_authors, team_sizes, missing_grades)
+        filename = os.path.join(output_dir, f"{prefix}_{event_id}{storage.FORMATS[fmt]}")
+        write_event(df, filename)
+        files.append(filename)
+    return files
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic ludum_dare_games_*.csv event files.")
+    parser.add_argument("--output_dir", type=str, default="synthetic", help="Directory for the event files")
+    parser.add_argument("--events", type=int, default=10, help="Number of events")
+    parser.add_argument("--games", type=int, default=1000, help="Games per event")
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed")
+    parser.add_argument("--team_sizes", type=parse_team_sizes, default=TEAM_SIZES, help="Share of games per team size, e.g. 1:0.5,2:0.3,4:0.2")
+    parser.add_argument("--missing_grades", type=float, default=0.05, help="Share of games without any grade")
+    parser.add_argument("--authors_per_game", type=float, default=0.8, help="Author pool size per game, lower means more returning authors")
+    parser.add_argument("--format", type=str, default="csv", choices=list(storage.FORMATS), help="Event file format")
+    args = parser.parse_args()
+
+    files = generate_events(args.output_dir, args.events, args.games, args.seed, args.team_sizes, args.missing_grades,
+                            args.authors_per_game, args.format)
+    print(f"Wrote {len(files)} events, {args.events * args.games} games, to {args.output_dir}")
@@ -0,0 +1,45 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "modules"))
+
+import pandas as pd
+import pytest
+import author_enrich
+import storage
+import synth_events
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_collect_author_ids_from_typed_files(tmp_path, fmt):
+    csv_files = synth_events.generate_events(str(tmp_path / "csv"), n_events=2, games_per_event=40, seed=3)
+    typed_files = synth_events.generate_events(str(tmp_path / fmt), n_events=2, games_per_event=40, seed=3, fmt=fmt)
+
+    ids = author_enrich.collect_author_ids(typed_files)
+    assert ids == author_enrich.collect_author_ids(csv_files)
+    assert all(type(author_id) is int for author_id in ids)
+
+    df = storage.read_exploded(typed_files[0], columns=["author"])
+    assert list(df.columns) == ["author"]
+    assert len(df) == sum(len(team) for team in storage.read_table(typed_files[0], columns=["author"])["author"])
+
+def test_collect_author_ids_skips_itch_ids(tmp_path):
+    event = tmp_path / "ludum_dare_games_1000001.csv"
+    itch_id = author_enrich.ITCH_AUTHOR_BASE + 1
+    event.write_text(f'id,author\n1,"[9110, {itch_id}]"\n2,[122697]\n', encoding="utf-8")
+    assert author_enrich.collect_author_ids([str(event)]) == {9110, 122697}
+
+def test_join_author_profiles_reads_ldjam_and_itch_tables(tmp_path):
+    ldjam = tmp_path / "authors.csv"
+    itch = tmp_path / "itch_authors.csv"
+    itch_id = author_enrich.ITCH_AUTHOR_BASE
+    ldjam.write_text("author,name,slug,profile_link,created,avatar\n9110,Ann,ann,/users/ann,,\n", encoding="utf-8")
+    itch.write_text(f"author,name,slug,profile_link,created,avatar\n{itch_id},Alice Dev,alice-dev,https://alice-dev.itch.io,,\n", encoding="utf-8")
+
+    ranked = pd.DataFrame({"rank": [1, 2, 3], "author": [itch_id, 9110, 42], "score": [3.0, 2.0, 1.0]})
+    joined = author_enrich.join_author_profiles(ranked, [str(ldjam), str(itch)])
+    assert list(joined.columns) == ["rank", "author", "author_name", "profile_link", "score"]
+    assert joined["author_name"].tolist()[:2] == ["Alice Dev", "Ann"]
+    assert pd.isna(joined["author_name"].iloc[2])
+    assert joined["profile_link"].iloc[0] == "https://alice-dev.itch.io"
+
+    assert author_enrich.join_author_profiles(ranked, [str(tmp_path / "missing.csv")]) is ranked
@@ -0,0 +1,41 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "modules"))
+
+import pandas as pd
+import pytest
+import author
+import author_index
+import schema
+import storage
+import synth_events
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "arrow"])
+def test_event_rows_reads_indexed_rows(tmp_path, fmt):
+    files = synth_events.generate_events(str(tmp_path / fmt), n_events=2, games_per_event=40, seed=3, fmt=fmt)
+    merged = author.merge_authors(files)
+    index = author_index.AuthorIndex(str(tmp_path / "index.sqlite"))
+    assert index.update(files, merged=merged) == files
+
+    author_id = int(merged.loc[merged["count"].idxmax(), "author"])
+    entries = merged[merged["author"] == author_id].sort_values(["file_name", "row"])
+    expected = schema.apply(pd.concat(
+        [storage.read_table(file).iloc[group["row"].tolist()] for file, group in entries.groupby("file_name", observed=True)],
+        ignore_index=True,
+    ))
+    pd.testing.assert_frame_equal(index.event_rows(author_id), expected)
+    pd.testing.assert_frame_equal(index.event_rows(author_id, columns=["id", "name"]), expected[["id", "name"]])
+
+    best = index.best_rank(author_id, "Overall")
+    assert best is None or type(best["result"]) is int
+    index.close()
+
+def test_read_rows_seeks_past_multiline_csv_fields(tmp_path):
+    event = tmp_path / "ludum_dare_games_1000001.csv"
+    storage.write_table(pd.DataFrame({"id": [1, 2, 3], "name": ["a", "two\nlines", "c"], "author": ["[7]", "[8]", "[9]"]}), str(event))
+
+    offsets = storage.csv_offsets(str(event))
+    assert len(offsets) == 4 and offsets[-1] == event.stat().st_size
+    rows = storage.read_rows({str(event): [2, 1]}, offsets={str(event): offsets})
+    pd.testing.assert_frame_equal(rows, storage.read_table(str(event)).iloc[[2, 1]].reset_index(drop=True))
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "modules"))
+
+import itch_jam
+import schema
+import storage
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "itch")
+JAM = "tiny-jam-7"
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+def test_parse_results_page():
+    page = itch_jam.parse_results_page(fixture("results.html"))
+    assert page["pages"] == 2
+    assert [entry["entry_id"] for entry in page["entries"]] == [2247001, 2247002]
+
+    first = page["entries"][0]
+    assert first["path"] == f"/jam/{JAM}/rate/2247001"
+    assert first["name"] == "Moss Keeper"
+    assert [slug for slug, _, _ in first["authors"]] == ["alice-dev", "bobsound"]  # Not the jam host
+    assert first["criteria"]["overall"] == (1, 4.41)
+    assert first["criteria"]["narrative"] == (7, 3.512)
+    assert first["ratings"] == 86
+    assert page["entries"][1]["name"] == "Lantern & Lighthouse"
+    assert page["entries"][1]["ratings"] == 1204
+
+def test_parse_entry_page():
+    details = itch_jam.parse_entry_page(fixture("rate_2247001.html"))
+    assert [slug for slug, _, _ in details["authors"]] == ["alice-dev", "bobsound", "dana-art"]
+    assert details["authors"][0] == ("alice-dev", "Alice Dev", "https://alice-dev.itch.io")
+    assert details["game_url"] == "https://alice-dev.itch.io/moss-keeper"
+    assert details["links"] == ["https://bobsound.bandcamp.com/album/moss", "https://www.youtube.com/watch?v=moss123"]
+    assert details["comments"] == 2
+    assert details["criteria"]["presentation"] == (4, 4.209)
+    assert details["ratings"] == 86
+
+def test_entry_page_without_submitted_by_falls_back_to_results_authors():
+    # The page still links the jam host and commenters, none of them are the team
+    details = itch_jam.parse_entry_page(fixture("rate_2247002.html"))
+    assert details["authors"] == []
+
+    entry = itch_jam.parse_results_page(fixture("results.html"))["entries"][1]
+    authors = {}
+    row = itch_jam.entry_row(entry, details, 1000001, 2, authors)
+    assert list(authors) == ["carolmakes"]
+    assert row["author"] == [itch_jam.ITCH_AUTHOR_BASE]
+    assert row["team_size"] == 1
+    assert row["data_authors"] == "https://carolmakes.itch.io"
+
+def test_entry_row_schema():
+    entry = itch_jam.parse_results_page(fixture("results.html"))["entries"][0]
+    row = itch_jam.entry_row(entry, itch_jam.parse_entry_page(fixture("rate_2247001.html")), 1000001, 1, {})
+    assert row["id"] == itch_jam.ITCH_GAME_BASE + 2247001
+    assert row["game_link"] == f"/jam/{JAM}/rate/2247001"
+    assert row["slug"] == "moss-keeper"
+    assert row["grade"] == 86
+    assert (row["grade-01-average"], row["grade-01-result"]) == (4.41, 1)  # Overall
+    assert (row["grade-03-average"], row["grade-03-result"]) == (4.651, 1)  # Creativity -> Innovation
+    assert (row["grade-05-average"], row["grade-05-result"]) == (4.209, 4)  # Presentation -> Graphics
+    assert "grade-06-average" not in row  # No Audio criteria, Narrative is dropped
+    assert set(row) <= set(schema.GAME_COLUMNS + schema.SCORE_COLUMNS)
+
+def serve_fixtures():
+    pages = {
+        f"/jam/{JAM}/results": "results.html",
+        f"/jam/{JAM}/results?page=2": "results_page2.html",
+        **{f"/jam/{JAM}/rate/{entry_id}": f"rate_{entry_id}.html" for entry_id in (2247001, 2247002, 2247003)},
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            name = pages.get(self.path)
+            body = fixture(name).encode("utf-8") if name else b"not found"
+            self.send_response(200 if name else 404)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def test_ingest_jam_from_local_fixtures(tmp_path):
+    server = serve_fixtures()
+    try:
+        filename = asyncio.run(itch_jam.ingest_jam(
+            JAM, 1000001, base_url=f"http://127.0.0.1:{server.server_address[1]}", rate=0, workers=1,
+            output_file=str(tmp_path / "ludum_dare_games"), author_file=str(tmp_path / "itch_authors.csv"),
+        ))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert filename == str(tmp_path / "ludum_dare_games_1000001.csv")
+    with open(filename, encoding="utf-8") as f:
+        assert f.readline().strip().split(",") == schema.GAME_COLUMNS + schema.SCORE_COLUMNS
+
+    df = storage.read_table(filename)
+    assert df["id"].tolist() == [itch_jam.ITCH_GAME_BASE + entry_id for entry_id in (2247001, 2247002, 2247003)]
+    assert df["game_position"].tolist() == [1, 2, 3]
+    base = itch_jam.ITCH_AUTHOR_BASE
+    assert df["author"].tolist() == [[base, base + 1, base + 2], [base + 3], [base]]  # alice-dev keeps the id from the first entry
+    assert set(df["ludum_dare_version"].astype(int)) == {1000001}
+    assert len(itch_jam.load_author_ids(str(tmp_path / "itch_authors.csv"))) == 4
@@ -0,0 +1,15 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "modules"))
+
+import pipeline
+
+def test_stage_code_covers_imported_project_modules():
+    stages = {stage.name: stage for stage in pipeline.build_stages(event_ids=[55])}
+    assert {"ludum_dare3", "scrape_manifest", "http_cache", "schema", "storage", "instrument"} <= set(stages["scrape"].code)
+    assert {"author", "author_index", "storage", "schema", "instrument"} <= set(stages["merge"].code)
+    assert {"rank_author", "author_enrich", "instrument", "schema"} <= set(stages["rank"].code)
+    assert {"rank_author1", "author_enrich", "instrument", "schema"} <= set(stages["rank1"].code)
+    for stage in stages.values():
+        assert "numpy" not in stage.code and "pandas" not in stage.code